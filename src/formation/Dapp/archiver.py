@@ -0,0 +1,152 @@
+from web3 import Web3
+from eth_utils import event_abi_to_log_topic
+import json
+import os
+import time
+from dotenv import load_dotenv
+from rpc import connect, LOG_BATCH_SIZE
+from compile import compile_contract, _atomic_write_json
+from registry import formation_address
+
+"""
+    Archiver of the droneData records evicted from the contract's ring buffer. Every DataEvicted event
+    names the index of an overwritten record, whose full content is still in its DataSubmitted log. The
+    archiver follows the evictions block range by block range, fetches the matching DataSubmitted logs
+    and appends the records, in index order, as JSON lines to a local file. Together with the records
+    still in the ring buffer this gives the complete mission log at a flat on-chain cost.
+
+    The checkpoint file next to the archive holds the last scanned block and the block of the last
+    archived submission (evicted records are always submitted after the previously evicted ones, so
+    the DataSubmitted lookups never rescan the chain from the start).
+"""
+
+TOPICS_PER_REQUEST = 100 # record indexes per DataSubmitted eth_getLogs request
+
+
+class Archiver:
+    """
+    Attributes: w3 (Web3 connection)
+                contract_instance (deployed LeaderFormation)
+                path (JSON lines archive, one evicted record per line)
+    """
+
+    def __init__(self, w3, contract_instance, path="drone_data_archive.jsonl", start_block=0, batch_size=LOG_BATCH_SIZE) -> None:
+        self.w3 = w3
+        self.contract_instance = contract_instance
+        self.path = path
+        self.batch_size = batch_size
+        self._checkpoint_path = path + ".checkpoint"
+        if os.path.exists(self._checkpoint_path):
+            with open(self._checkpoint_path) as file:
+                checkpoint = json.load(file)
+        else:
+            checkpoint = {"block": start_block - 1, "submitted_block": start_block}
+        self.checkpoint = checkpoint["block"]
+        self._submitted_block = checkpoint["submitted_block"]
+        self._next_index = self._last_archived_index() + 1
+        self._evicted = contract_instance.events.DataEvicted()
+        self._submitted = contract_instance.events.DataSubmitted()
+        self._evicted_topic = Web3.to_hex(event_abi_to_log_topic(self._evicted.abi))
+        self._submitted_topic = Web3.to_hex(event_abi_to_log_topic(self._submitted.abi))
+
+    def _last_archived_index(self):
+        """Index of the last record in the archive (-1 if it is empty), so a crash never duplicates lines."""
+        if not os.path.exists(self.path):
+            return -1
+        with open(self.path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            tail = b""
+            while position > 0 and tail.count(b"\n") < 2:
+                step = min(4096, position)
+                position -= step
+                file.seek(position)
+                tail = file.read(step) + tail
+        lines = tail.strip().splitlines()
+        return json.loads(lines[-1])["index"] if lines else -1
+
+    def sync(self, to_block=None):
+        """Archives the records evicted up to to_block (latest by default). Returns the number of archived records."""
+        if to_block is None:
+            to_block = self.w3.eth.block_number
+        archived = 0
+        from_block = self.checkpoint + 1
+        while from_block <= to_block:
+            end_block = min(from_block + self.batch_size - 1, to_block)
+            logs = self.w3.eth.get_logs({
+                "address": self.contract_instance.address,
+                "fromBlock": from_block,
+                "toBlock": end_block,
+                "topics": [self._evicted_topic],
+            })
+            indexes = sorted(index for index in (self._evicted.process_log(log)["args"]["index"] for log in logs)
+                             if index >= self._next_index)
+            records = self._fetch_records(indexes, end_block)
+            if records:
+                with open(self.path, "a") as file:
+                    for record in records:
+                        file.write(json.dumps(record) + "\n")
+                    file.flush()
+                    os.fsync(file.fileno())
+                self._next_index = records[-1]["index"] + 1
+                self._submitted_block = records[-1]["block"]
+                archived += len(records)
+            self.checkpoint = end_block
+            _atomic_write_json(self._checkpoint_path, {"block": self.checkpoint, "submitted_block": self._submitted_block})
+            from_block = end_block + 1
+        return archived
+
+    def _fetch_records(self, indexes, to_block):
+        records = []
+        for i in range(0, len(indexes), TOPICS_PER_REQUEST):
+            chunk = indexes[i:i + TOPICS_PER_REQUEST]
+            logs = self.w3.eth.get_logs({
+                "address": self.contract_instance.address,
+                "fromBlock": self._submitted_block,
+                "toBlock": to_block,
+                "topics": [self._submitted_topic, None, ["0x" + index.to_bytes(32, "big").hex() for index in chunk]],
+            })
+            for log in logs:
+                event = self._submitted.process_log(log)
+                args = event["args"]
+                records.append({"index": args["index"], "block": event["blockNumber"], "timestamp": args["timestamp"],
+                                "submitter": args["submitter"], "location": args["location"], "data": args["data"],
+                                "tx": Web3.to_hex(event["transactionHash"])})
+        records.sort(key=lambda record: record["index"])
+        return records
+
+    def follow(self, poll_interval=5.0):
+        """Keeps archiving the new evictions, forever."""
+        while True:
+            self.sync()
+            time.sleep(poll_interval)
+
+
+def iter_archive(path="drone_data_archive.jsonl", submitter=None):
+    """Yields (timestamp, location, data, submitter) records from the archive, like Drone.iter_drone_data."""
+    if not os.path.exists(path):
+        return
+    with open(path) as file:
+        for line in file:
+            record = json.loads(line)
+            if submitter is None or record["submitter"] == submitter:
+                yield record["timestamp"], record["location"], record["data"], record["submitter"]
+
+
+def main():
+    """ Runs the archiver as a standalone process. ARCHIVE_FILE and ARCHIVE_START_BLOCK can be set in .env."""
+    load_dotenv()
+    URL_RPC = os.getenv("URL_RPC")
+    w3 = connect(URL_RPC)
+
+    abi, bytecode = compile_contract()
+    contract_instance = w3.eth.contract(address=formation_address(w3), abi=abi) # CONTR_ADD, or SWARM_ID's formation in the registry
+
+    archiver = Archiver(w3, contract_instance, os.getenv("ARCHIVE_FILE", "drone_data_archive.jsonl"), int(os.getenv("ARCHIVE_START_BLOCK", "0")))
+    print(f"Catching up from block {archiver.checkpoint + 1}...")
+    print(f"[+] {archiver.sync()} records archived, checkpoint at block {archiver.checkpoint}")
+    archiver.follow()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import asyncio
+from drone import Drone, SwarmSnapshot, DATA_PAGE_SIZE, registration_batches, registration_probe, probe_gas_per_address, assigned_position
+from location import encode, decode
+from bitmap import free_mask, free_positions
+from telemetry import committed_batch_id
+
+"""
+    Asyncio variant of the Leader/Follower API, built on AsyncWeb3 (w3 and contract_instance must
+    come from AsyncWeb3). Every method is a coroutine, so transactions can be started as tasks and
+    their receipts awaited later, e.g. heartbeats, battery reports and position claims overlap with
+    mavsdk flight control instead of blocking the event loop.
+
+        w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(URL_RPC))
+        contract_instance = w3.eth.contract(address=CONTR_ADD, abi=abi)
+        receipt = await asyncio.create_task(lead.send_heartbeat(contract_instance, w3))
+
+    AsyncDrone overrides every Drone method that talks to the node, the inherited ones only touch the
+    local state (id, location, battery, slot, relative_pos).
+"""
+
+
+class AsyncDrone(Drone):
+
+    __slots__ = ("_address",)
+
+    async def address(self, w3):
+        """The drone's account, fetched once from the node."""
+        if getattr(self, "_address", None) is None:
+            accounts = await w3.eth.accounts
+            self._address = accounts[self.id]
+        return self._address
+
+    async def account(self, w3):
+        return await self.address(w3)
+
+    async def _transact(self, function, w3, wait=True):
+        tx_hash = await function.transact({"from": await self.address(w3)})
+        if not wait:
+            return tx_hash
+        return await self.wait_for_receipt(tx_hash, w3)
+
+    async def wait_for_receipt(self, tx_hash, w3):
+        return await w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    async def get_snapshot(self, contract_instance, battery_of=()):
+        battery_of = list(battery_of)
+        return SwarmSnapshot(await contract_instance.functions.getSwarmSnapshot(battery_of).call(), battery_of)
+
+    async def get_position_bitmap(self, contract_instance, mission_id=None):
+        if mission_id is None:
+            return await contract_instance.functions.getPositionBitmap().call()
+        return await contract_instance.functions.getPositionBitmapFor(mission_id).call()
+
+    async def available_positions_mask(self, contract_instance, mission_id=None):
+        return free_mask(*await self.get_position_bitmap(contract_instance, mission_id))
+
+    async def get_location(self, contract_instance, address):
+        packed, timestamp = await contract_instance.functions.getLocation(address).call()
+        return decode(packed)
+
+    async def submit_location(self, contract_instance, w3, lat, lon, alt=0.0):
+        return await self._transact(contract_instance.functions.submitLocation(encode(lat, lon, alt)), w3)
+
+    async def commit_batch(self, contract_instance, w3, root, count):
+        tx_receipt = await self._transact(contract_instance.functions.commitBatch(root, count), w3)
+        return tx_receipt, committed_batch_id(contract_instance, tx_receipt)
+
+    async def verify_reading(self, contract_instance, batch_id, leaf, proof):
+        return await contract_instance.functions.verifyReading(batch_id, leaf, list(proof)).call()
+
+    async def latest_location(self, contract_instance, address):
+        return (await contract_instance.functions.getLatestData(address).call())[1]
+
+    async def get_drone_data_count(self, contract_instance, submitter=None):
+        if submitter is None:
+            return await contract_instance.functions.getDroneDataCount().call()
+        return await contract_instance.functions.getDroneDataCountBySubmitter(submitter).call()
+
+    async def iter_drone_data(self, contract_instance, submitter=None, page_size=DATA_PAGE_SIZE):
+        offset = 0
+        while True:
+            if submitter is None:
+                start, page = await contract_instance.functions.getDroneDataRange(offset, page_size).call()
+            else:
+                start, page = await contract_instance.functions.getDroneDataBySubmitter(submitter, offset, page_size).call()
+            for record in page:
+                yield record
+            if len(page) < page_size:
+                return
+            offset = start + len(page)
+
+
+class AsyncLeader(AsyncDrone):
+
+    __slots__ = ()
+
+    async def add_drone(self, contract_instance, w3, drone_address):
+        return await self._transact(contract_instance.functions.addDrone(drone_address), w3)
+
+    async def remove_drone(self, contract_instance, w3, drone_address):
+        return await self._transact(contract_instance.functions.removeDrone(drone_address), w3)
+
+    async def add_drones(self, contract_instance, w3, drone_addresses, batch_size=None):
+        batches = await self._registration_batches(contract_instance.functions.addDrones, w3, drone_addresses, batch_size)
+        return await asyncio.gather(*(self._transact(contract_instance.functions.addDrones(batch), w3) for batch in batches))
+
+    async def remove_drones(self, contract_instance, w3, drone_addresses, batch_size=None):
+        batches = await self._registration_batches(contract_instance.functions.removeDrones, w3, drone_addresses, batch_size)
+        return await asyncio.gather(*(self._transact(contract_instance.functions.removeDrones(batch), w3) for batch in batches))
+
+    async def _registration_batches(self, function, w3, drone_addresses, batch_size=None):
+        drone_addresses = list(drone_addresses)
+        gas_per_address = None
+        if batch_size is None:
+            probe = registration_probe(drone_addresses)
+            if probe:
+                gas_per_address = probe_gas_per_address(probe, await function(probe).estimate_gas({"from": await self.account(w3)}))
+        block = await w3.eth.get_block("latest")
+        return registration_batches(drone_addresses, block["gasLimit"], batch_size, gas_per_address)
+
+    async def create_mission(self, contract_instance, w3, mission_name, mission_type, formation_type):
+        return await self._transact(contract_instance.functions.createMission(mission_name, mission_type, formation_type), w3)
+
+    async def update_mission(self, contract_instance, w3, missionId, mission_name, mission_type, formation_type):
+        return await self._transact(contract_instance.functions.updateMission(missionId, mission_name, mission_type, formation_type), w3)
+
+    async def activate_mission(self, contract_instance, w3, missionId):
+        return await self._transact(contract_instance.functions.activateMission(missionId), w3)
+
+    async def deactivate_mission(self, contract_instance, w3, missionId):
+        return await self._transact(contract_instance.functions.deactivateMission(missionId), w3)
+
+    async def get_available_positions(self, contract_instance, mission_id=None):
+        return sorted(free_positions(*await self.get_position_bitmap(contract_instance, mission_id)))
+
+    async def submit_data(self, contract_instance, w3, location, data):
+        return await self._transact(contract_instance.functions.submitData(location, data), w3)
+
+    async def send_heartbeat(self, contract_instance, w3):
+        return await self._transact(contract_instance.functions.sendHeartbeat(), w3)
+
+    async def submit_battery_level(self, contract_instance, w3, battery):
+        return await self._transact(contract_instance.functions.submitBatteryLevel(battery), w3)
+
+
+class AsyncFollower(AsyncDrone):
+
+    __slots__ = ()
+
+    async def select_position(self, contract_instance, w3, position, mission_id=None):
+        if mission_id is None:
+            return await self._transact(contract_instance.functions.assignPosition(position), w3)
+        return await self._transact(contract_instance.functions.assignPositionFor(mission_id, position), w3)
+
+    async def claim_best_position(self, contract_instance, w3, preferences, mission_id=None):
+        if mission_id is None:
+            function = contract_instance.functions.assignBestAvailable(list(preferences))
+        else:
+            function = contract_instance.functions.assignBestAvailableFor(mission_id, list(preferences))
+        tx_receipt = await self._transact(function, w3)
+        return tx_receipt, assigned_position(contract_instance, tx_receipt)
+
+    async def release_position(self, contract_instance, w3):
+        return await self._transact(contract_instance.functions.releasePosition(), w3)
+
+    async def submit_data(self, contract_instance, w3, location, data):
+        return await self._transact(contract_instance.functions.submitData(location, data), w3)
+
+    async def get_drone_data(self, contract_instance):
+        return await contract_instance.functions.getDroneData().call()
+
+    async def get_available_positions(self, contract_instance, mission_id=None):
+        return sorted(free_positions(*await self.get_position_bitmap(contract_instance, mission_id)))
+
+    async def get_mission(self, contract_instance, missionId):
+        return await contract_instance.functions.getMission(missionId).call()
+
+    async def get_position(self, contract_instance, w3, mission_id):
+        return await contract_instance.functions.getPosition(mission_id, await self.address(w3)).call()
+
+    async def check_leader_status(self, contract_instance, w3):
+        if await self.leader_is_alive(contract_instance, w3):
+            return None
+        return await self._transact(contract_instance.functions.checkLeaderStatus(), w3)
+
+    async def leader_is_alive(self, contract_instance, w3):
+        return await contract_instance.functions.leaderIsAlive().call({"from": await self.address(w3)})
+
+    async def submit_battery_level(self, contract_instance, w3, battery):
+        return await self._transact(contract_instance.functions.submitBatteryLevel(battery), w3)
+
+    async def leader_address(self, contract_instance, w3):
+        return await contract_instance.functions.leader().call({"from": await self.address(w3)})
@@ -0,0 +1,25 @@
+import numpy as np
+
+"""
+    Decoder for the contract's formation occupancy bitmap (getPositionBitmap / getPositionBitmapFor):
+    a list of uint256 words where bit p % 256 of word p // 256 is set while position p is taken.
+    Valid positions are 1 .. position_count - 1.
+"""
+
+
+def taken_mask(words, position_count):
+    """NumPy mask over the positions 0 .. position_count - 1, True where the position is taken."""
+    raw = b"".join(int(word).to_bytes(32, "little") for word in words)
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")
+    return bits[:position_count].astype(bool)
+
+
+def free_mask(words, position_count):
+    """NumPy mask over the positions 0 .. position_count - 1, True where a valid position is free."""
+    mask = ~taken_mask(words, position_count)
+    mask[:1] = False
+    return mask
+
+
+def free_positions(words, position_count):
+    return set(np.flatnonzero(free_mask(words, position_count)).tolist())
@@ -0,0 +1,107 @@
+from web3 import Web3
+from eth_utils import event_abi_to_log_topic
+from collections import OrderedDict
+import time
+from rpc import LOG_BATCH_SIZE
+
+"""
+    Read-through cache of the missions, which rarely change. Reads are answered from memory, and every
+    sync_interval seconds a single eth_getLogs request fetches the events mined since the last sync and
+    drops exactly the missions they touch:
+
+        MissionUpdated/Activated/Deactivated(missionId)  ->  get_mission(missionId)
+
+    Entries also expire after ttl seconds and the least recently used ones are evicted beyond maxsize,
+    which bounds the staleness after a missed sync or a reorg.
+
+        cache = ContractCache(w3, contract_instance)
+        name, mission_type, formation_type, active = cache.get_mission(0)
+
+    The leader and its liveness are read with the swarm snapshot (Drone.get_snapshot) on every loop
+    iteration instead, liveness depends on the time (see the leaderIsAlive view).
+"""
+
+CACHE_TTL = 60 # seconds an entry is served without an invalidating event
+CACHE_SIZE = 1024 # entries kept at most, least recently used first out
+SYNC_INTERVAL = 2.0 # seconds between two invalidation eth_getLogs requests
+INVALIDATING_EVENTS = ("MissionUpdated", "MissionActivated", "MissionDeactivated")
+
+
+class ContractCache:
+    """
+    Attributes: w3 (Web3 connection)
+                contract_instance (deployed LeaderFormation)
+                checkpoint (last block whose events are applied)
+                hits, misses (reads answered from memory, reads sent to the node)
+    """
+
+    def __init__(self, w3, contract_instance, ttl=CACHE_TTL, maxsize=CACHE_SIZE, sync_interval=SYNC_INTERVAL) -> None:
+        self.w3 = w3
+        self.contract_instance = contract_instance
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.sync_interval = sync_interval
+        self.checkpoint = w3.eth.block_number # nothing cached yet, older events don't matter
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (value, expiry)
+        self._last_sync = time.monotonic()
+        self._events = {}
+        for name in INVALIDATING_EVENTS:
+            event = getattr(contract_instance.events, name)()
+            self._events[event_abi_to_log_topic(event.abi)] = event
+
+    def get_mission(self, mission_id):
+        return self._get(("mission", mission_id), self.contract_instance.functions.getMission(mission_id).call)
+
+    def _get(self, key, load):
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = load()
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *key):
+        """Drops one entry, e.g. invalidate("mission", 0), or all of them without a key."""
+        if key:
+            self._entries.pop(key, None)
+        else:
+            self._entries.clear()
+
+    def sync(self, to_block=None):
+        """Applies the invalidating events up to to_block (latest by default). Returns the number of dropped entries."""
+        self._last_sync = time.monotonic()
+        if to_block is None:
+            to_block = self.w3.eth.block_number
+        if to_block <= self.checkpoint:
+            return 0
+        if to_block - self.checkpoint > LOG_BATCH_SIZE:
+            # idle for too long, starting over is cheaper than replaying the range
+            dropped = len(self._entries)
+            self.invalidate()
+            self.checkpoint = to_block
+            return dropped
+        logs = self.w3.eth.get_logs({
+            "address": self.contract_instance.address,
+            "fromBlock": self.checkpoint + 1,
+            "toBlock": to_block,
+            "topics": [[Web3.to_hex(topic) for topic in self._events]],
+        })
+        dropped = len(self._entries)
+        for log in logs:
+            event = self._events.get(bytes(log["topics"][0]))
+            if event is None:
+                continue
+            decoded = event.process_log(log)
+            self.invalidate("mission", decoded["args"]["missionId"])
+        self.checkpoint = to_block
+        return dropped - len(self._entries)
@@ -1,17 +1,183 @@
+from location import coordinates, encode, decode
+from swarm import SwarmState
+from bitmap import free_mask, free_positions
+from formations import rank_slots
+from telemetry import committed_batch_id
+
+DATA_PAGE_SIZE = 50 # number of droneData records fetched per eth_call when streaming
+GAS_PER_REGISTRATION = 30000 # least gas assumed per address, about what adding a new drone costs
+REGISTRATION_PROBE_SIZE = 16 # addresses in the batch whose gas estimate sizes addDrones/removeDrones batches
+BLOCK_GAS_SHARE = 0.8 # share of the block gas limit a single batch transaction may use
+PREFERENCES_LIMIT = 32 # positions sent to assignBestAvailable at most
+
+
+def registration_batches(drone_addresses, gas_limit, batch_size=None, gas_per_address=None):
+    """
+    Splits drone_addresses into chunks that fit into a block with gas_limit, for addDrones/removeDrones.
+    gas_per_address is the measured cost of one address (see probe_gas_per_address), removing a drone 
+    or adding back one with a battery level costs well over GAS_PER_REGISTRATION.
+    """
+    if batch_size is None:
+        gas_per_address = max(gas_per_address or 0, GAS_PER_REGISTRATION)
+        batch_size = max(1, int(gas_limit * BLOCK_GAS_SHARE // gas_per_address))
+    drone_addresses = list(drone_addresses)
+    return [drone_addresses[i:i + batch_size] for i in range(0, len(drone_addresses), batch_size)]
+
+
+def registration_probe(drone_addresses):
+    return list(drone_addresses)[:REGISTRATION_PROBE_SIZE]
+
+
+def probe_gas_per_address(probe, estimate):
+    """Gas per address of a batch transaction from the estimate for the probe addresses, the transaction's
+       base cost included, which leaves some headroom for the addresses after the probe."""
+    return estimate / len(probe) if probe else None
+
+
+def assigned_position(contract_instance, tx_receipt):
+    """Position assigned by a transaction, from its PositionAssigned event (None if there is none)."""
+    for event in contract_instance.events.PositionAssigned().process_receipt(tx_receipt):
+        return event["args"]["position"]
+    return None
+
+
+class SwarmSnapshot:
+    """
+    Python side of the contract's getSwarmSnapshot view, consumed by the control loops.
+
+    Attributes: leader, leader_is_alive, last_heartbeat, drone_count
+                active_mission (None or (name, missionType, formationType, active) like getMission)
+                active_mission_id, available_positions
+                battery_levels (address -> battery level of the requested drones)
+    """
+
+    def __init__(self, result, battery_of=()) -> None:
+        leader, leader_is_alive, last_heartbeat, drone_count, has_active_mission, mission, position_bitmap, battery_levels = result
+        self.leader = leader
+        self.leader_is_alive = leader_is_alive
+        self.last_heartbeat = last_heartbeat
+        self.drone_count = drone_count
+        self.active_mission_id = mission[0] if has_active_mission else None
+        self.active_mission = tuple(mission[1:]) if has_active_mission else None
+        # the contract returns the occupancy bitmap, a few words even for thousands of positions
+        self.available_positions = sorted(free_positions(position_bitmap, drone_count))
+        self.battery_levels = dict(zip(battery_of, battery_levels))
+
+    def __str__(self) -> str:
+        return (f'Leader={self.leader} (alive={self.leader_is_alive}), Drones={self.drone_count}, '
+                f'Mission={self.active_mission_id}, Available positions={self.available_positions}')
+
+
 class Drone:
-"""
-A simple class for simulating swarm drones in Dapp and checking smart contract's functionality. 
+    """
+    A simple class for simulating swarm drones in Dapp and checking smart contract's functionality. 
 
-Attributes: id (Drone's ID)
-            location (Drone's location)
-            battery (Drone's battery level)
-"""
+    Attributes: id (Drone's ID)
+                location (Drone's location)
+                battery (Drone's battery level)
+                slot (Drone's position in the formation, 0 if none)
 
+    The attributes live in a row of a SwarmState (see swarm.py), so that many simulated drones share
+    columnar arrays. A standalone drone gets its own one row state.
 
-    def __init__(self, id, location, battery) -> None:
-        self.id = id
-        self.location = location
-        self.battery = battery
+    Transactions are sent from the node's unlocked account number id, or signed locally when the drone
+    has a signer (see signer.py). With wait=False the transaction methods return the transaction hash 
+    right away, so that several transactions of the drone can be in flight at once. Their receipts come
+    from a shared ReceiptTracker (see receipts.py) when the drone has a tracker.
+    """
+
+    __slots__ = ("_state", "_row", "_signer", "_tracker")
+
+    def __init__(self, id, location, battery, state=None, signer=None, tracker=None) -> None:
+        if state is None:
+            state = SwarmState(1)
+        self._state = state
+        self._row = state.add(id, location, battery)
+        self._signer = signer
+        self._tracker = tracker
+
+    @classmethod
+    def view(cls, state, row):
+        """Drone object backed by an existing row of state."""
+        drone = cls.__new__(cls)
+        drone._state = state
+        drone._row = row
+        drone._signer = None
+        drone._tracker = None
+        return drone
+
+    @property
+    def id(self):
+        return int(self._state.ids[self._row])
+
+    @id.setter
+    def id(self, id):
+        self._state.ids[self._row] = id
+
+    @property
+    def location(self):
+        x, y = self._state.positions[self._row]
+        return f'{x}, {y}'
+
+    @location.setter
+    def location(self, location):
+        self._state.positions[self._row] = coordinates(location)
+
+    @property
+    def battery(self):
+        return int(self._state.battery[self._row])
+
+    @battery.setter
+    def battery(self, battery):
+        self._state.battery[self._row] = battery
+
+    @property
+    def slot(self):
+        return int(self._state.slots[self._row])
+
+    @slot.setter
+    def slot(self, slot):
+        self._state.slots[self._row] = slot
+
+    @property
+    def signer(self):
+        return self._signer
+
+    @signer.setter
+    def signer(self, signer):
+        self._signer = signer
+
+    @property
+    def tracker(self):
+        return self._tracker
+
+    @tracker.setter
+    def tracker(self, tracker):
+        self._tracker = tracker
+
+    def account(self, w3):
+        """Address the drone's transactions are sent from."""
+        if self._signer is not None:
+            return self._signer.address
+        return w3.eth.accounts[self.id]
+
+    def _transact(self, function, w3, wait=True):
+        """Sends function's transaction. Returns its receipt, or only its hash when wait is False."""
+        if self._signer is not None:
+            tx_hash = self._signer.send(function)
+        else:
+            tx_hash = function.transact({"from": w3.eth.accounts[self.id]})
+        if not wait:
+            return tx_hash
+        return self.wait_for_receipt(tx_hash, w3)
+
+    def wait_for_receipt(self, tx_hash, w3):
+        """Receipt of a transaction sent with wait=False."""
+        if self._signer is not None:
+            return self._signer.wait(tx_hash)
+        if self._tracker is not None:
+            return self._tracker.wait(tx_hash)
+        return w3.eth.wait_for_transaction_receipt(tx_hash)
 
     def set_battery(self, battery):
         self.battery = battery
@@ -20,110 +186,192 @@ Attributes: id (Drone's ID)
         return f'Drone:ID={self.id}, Position=({self.location})'
     
     def relative_pos(self, pos):
-        """Calculates drone's relative coordinates to a specific reference point.""" 
-        coords_self = self.location.split(", ")
-        x_self = float(coords_self[0])
-        y_self = float(coords_self[1])
-        coords_other = pos.split(", ")
-        x_other = float(coords_other[0])
-        y_other = float(coords_other[1])
+        """Calculates drone's relative coordinates to a specific reference point (a "x, y" string or a coordinate tuple).""" 
+        x_self, y_self = self._state.positions[self._row].tolist()
+        x_other, y_other = coordinates(pos)
         x_relative = x_self - x_other
         y_relative = y_self - y_other
         return x_relative, y_relative
 
+    def get_drone_data_count(self, contract_instance, submitter=None):
+        if submitter is None:
+            return contract_instance.functions.getDroneDataCount().call()
+        return contract_instance.functions.getDroneDataCountBySubmitter(submitter).call()
+
+    def get_snapshot(self, contract_instance, battery_of=()):
+        """Leader, liveness, drone count, active mission, available positions and battery levels in one eth_call."""
+        battery_of = list(battery_of)
+        return SwarmSnapshot(contract_instance.functions.getSwarmSnapshot(battery_of).call(), battery_of)
+
+    def get_position_bitmap(self, contract_instance, mission_id=None):
+        """Raw occupancy bitmap (words, position_count) of the active mission's formation, or of mission_id."""
+        if mission_id is None:
+            return contract_instance.functions.getPositionBitmap().call()
+        return contract_instance.functions.getPositionBitmapFor(mission_id).call()
+
+    def available_positions_mask(self, contract_instance, mission_id=None):
+        """NumPy mask indexed by position, True where the position is free."""
+        return free_mask(*self.get_position_bitmap(contract_instance, mission_id))
+
+    def get_location(self, contract_instance, address):
+        """Latest packed location submitted by address, decoded to (lat, lon, alt)."""
+        packed, timestamp = contract_instance.functions.getLocation(address).call()
+        return decode(packed)
+
+    def commit_batch(self, contract_instance, w3, root, count):
+        """Commits the Merkle root of count off-chain readings (see telemetry.py). Returns (receipt, batch_id)."""
+        tx_receipt = self._transact(contract_instance.functions.commitBatch(root, count), w3)
+        return tx_receipt, committed_batch_id(contract_instance, tx_receipt)
+
+    def verify_reading(self, contract_instance, batch_id, leaf, proof):
+        return contract_instance.functions.verifyReading(batch_id, leaf, list(proof)).call()
+
+    def latest_location(self, contract_instance, address):
+        """Returns the location string of the latest record submitted by address."""
+        return contract_instance.functions.getLatestData(address).call()[1]
+
+    def iter_drone_data(self, contract_instance, submitter=None, page_size=DATA_PAGE_SIZE):
+        """
+        Streams the data records still stored in the ring buffer in pages of page_size, optionally only the ones
+        of a specific submitter. Records evicted while streaming are skipped, the archiver keeps the older ones.
+        """
+        offset = 0
+        while True:
+            if submitter is None:
+                start, page = contract_instance.functions.getDroneDataRange(offset, page_size).call()
+            else:
+                start, page = contract_instance.functions.getDroneDataBySubmitter(submitter, offset, page_size).call()
+            yield from page
+            if len(page) < page_size:
+                return
+            offset = start + len(page)
+
 class Leader(Drone):
 
     """
     This class inherits from Drone and has as methods all the smart contract's available functions for Leader. Same for the Follower class.
     """
 
-    def __init__(self, id, location, battery) -> None:
-        super().__init__(id, location, battery)
-
-    def add_drone(self, contract_instance, w3, drone_address):
-        tx_hash = contract_instance.functions.addDrone(drone_address).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-    def remove_drone(self, contract_instance, w3, drone_address):
-        tx_hash = contract_instance.functions.removeDrone(drone_address).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-    def create_mission(self, contract_instance, w3, mission_name, mission_type, formation_type):
-        tx_hash = contract_instance.functions.createMission(mission_name, mission_type, formation_type).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-    def update_mission(self, contract_instance, w3, missionId, mission_name, mission_type, formation_type):
-        tx_hash = contract_instance.functions.updateMission(missionId, mission_name, mission_type, formation_type).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-    def activate_mission(self, contract_instance, w3, missionId):
-        tx_hash = contract_instance.functions.activateMission(missionId).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-    def deactivate_mission(self, contract_instance, w3, missionId):
-        tx_hash = contract_instance.functions.deactivateMission(missionId).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-    def get_available_positions(self, contract_instance):
-        return contract_instance.functions.getAvailablePositions().call()
+    __slots__ = ()
+
+    def add_drone(self, contract_instance, w3, drone_address, wait=True):
+        return self._transact(contract_instance.functions.addDrone(drone_address), w3, wait)
+
+    def remove_drone(self, contract_instance, w3, drone_address, wait=True):
+        return self._transact(contract_instance.functions.removeDrone(drone_address), w3, wait)
+
+    def add_drones(self, contract_instance, w3, drone_addresses, batch_size=None):
+        """Registers many drones with one addDrones transaction per gas-limit sized chunk. The chunks are 
+           sent back to back and their receipts are collected afterwards."""
+        tx_hashes = []
+        for batch in self._registration_batches(contract_instance.functions.addDrones, w3, drone_addresses, batch_size):
+            tx_hashes.append(self._transact(contract_instance.functions.addDrones(batch), w3, wait=False))
+        return [self.wait_for_receipt(tx_hash, w3) for tx_hash in tx_hashes]
+
+    def remove_drones(self, contract_instance, w3, drone_addresses, batch_size=None):
+        tx_hashes = []
+        for batch in self._registration_batches(contract_instance.functions.removeDrones, w3, drone_addresses, batch_size):
+            tx_hashes.append(self._transact(contract_instance.functions.removeDrones(batch), w3, wait=False))
+        return [self.wait_for_receipt(tx_hash, w3) for tx_hash in tx_hashes]
+
+    def _registration_batches(self, function, w3, drone_addresses, batch_size=None):
+        """Chunks for function (addDrones or removeDrones), sized from the gas estimate of a probe batch."""
+        drone_addresses = list(drone_addresses)
+        gas_per_address = None
+        if batch_size is None:
+            probe = registration_probe(drone_addresses)
+            if probe:
+                gas_per_address = probe_gas_per_address(probe, function(probe).estimate_gas({"from": self.account(w3)}))
+        return registration_batches(drone_addresses, w3.eth.get_block("latest")["gasLimit"], batch_size, gas_per_address)
+
+    def create_mission(self, contract_instance, w3, mission_name, mission_type, formation_type, wait=True):
+        return self._transact(contract_instance.functions.createMission(mission_name, mission_type, formation_type), w3, wait)
+
+    def update_mission(self, contract_instance, w3, missionId, mission_name, mission_type, formation_type, wait=True):
+        return self._transact(contract_instance.functions.updateMission(missionId, mission_name, mission_type, formation_type), w3, wait)
+
+    def activate_mission(self, contract_instance, w3, missionId, wait=True):
+        return self._transact(contract_instance.functions.activateMission(missionId), w3, wait)
+
+    def deactivate_mission(self, contract_instance, w3, missionId, wait=True):
+        return self._transact(contract_instance.functions.deactivateMission(missionId), w3, wait)
+
+    def get_available_positions(self, contract_instance, mission_id=None):
+        return sorted(free_positions(*self.get_position_bitmap(contract_instance, mission_id)))
     
-    def submit_data(self, contract_instance, w3, location, data):
-        tx_hash = contract_instance.functions.submitData(location, data).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    def submit_data(self, contract_instance, w3, location, data, wait=True):
+        return self._transact(contract_instance.functions.submitData(location, data), w3, wait)
     
-    def send_heartbeat(self, contract_instance, w3):
-        tx_hash = contract_instance.functions.sendHeartbeat().transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    def submit_location(self, contract_instance, w3, lat, lon, alt=0.0, wait=True):
+        return self._transact(contract_instance.functions.submitLocation(encode(lat, lon, alt)), w3, wait)
+
+    def send_heartbeat(self, contract_instance, w3, wait=True):
+        return self._transact(contract_instance.functions.sendHeartbeat(), w3, wait)
     
-    def submit_battery_level(self, contract_instance, w3, battery):
-        tx_hash = contract_instance.functions.submitBatteryLevel(battery).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    def submit_battery_level(self, contract_instance, w3, battery, wait=True):
+        return self._transact(contract_instance.functions.submitBatteryLevel(battery), w3, wait)
         
 
 class Follower(Drone):
-    def __init__(self, id, location, battery) -> None:
-        super().__init__(id, location, battery)
 
-    def select_position(self, contract_instance, w3, position):
-        tx_hash = contract_instance.functions.assignPosition(position).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    __slots__ = ()
+
+    def select_position(self, contract_instance, w3, position, mission_id=None, wait=True):
+        """Claims a position in the active mission's formation, or in the one of mission_id."""
+        if mission_id is None:
+            function = contract_instance.functions.assignPosition(position)
+        else:
+            function = contract_instance.functions.assignPositionFor(mission_id, position)
+        return self._transact(function, w3, wait)
+
+    def claim_best_position(self, contract_instance, w3, preferences, mission_id=None):
+        """Claims the first free position of the ranked preferences with one transaction. Returns (receipt, position)."""
+        if mission_id is None:
+            function = contract_instance.functions.assignBestAvailable(list(preferences))
+        else:
+            function = contract_instance.functions.assignBestAvailableFor(mission_id, list(preferences))
+        tx_receipt = self._transact(function, w3)
+        return tx_receipt, assigned_position(contract_instance, tx_receipt)
 
-    def submit_data(self, contract_instance, w3, location, data):
-        tx_hash = contract_instance.functions.submitData(location, data).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    def claim_closest_position(self, contract_instance, w3, rel_pos, slot_coords, mission_id=None, limit=PREFERENCES_LIMIT):
+        """Same as above, with the limit free slots closest to rel_pos as preferences (bounded calldata in large swarms)."""
+        free = self.available_positions_mask(contract_instance, mission_id)
+        preferences = [position for position in rank_slots(rel_pos, slot_coords) if position < len(free) and free[position]]
+        return self.claim_best_position(contract_instance, w3, preferences[:limit], mission_id)
+
+    def release_position(self, contract_instance, w3, wait=True):
+        return self._transact(contract_instance.functions.releasePosition(), w3, wait)
+
+    def submit_data(self, contract_instance, w3, location, data, wait=True):
+        return self._transact(contract_instance.functions.submitData(location, data), w3, wait)
+
+    def submit_location(self, contract_instance, w3, lat, lon, alt=0.0, wait=True):
+        return self._transact(contract_instance.functions.submitLocation(encode(lat, lon, alt)), w3, wait)
 
     def get_drone_data(self, contract_instance):
         return contract_instance.functions.getDroneData().call()
 
-    def get_available_positions(self, contract_instance):
-        return contract_instance.functions.getAvailablePositions().call()
+    def get_available_positions(self, contract_instance, mission_id=None):
+        return sorted(free_positions(*self.get_position_bitmap(contract_instance, mission_id)))
 
     def get_mission(self, contract_instance, missionId):
         return contract_instance.functions.getMission(missionId).call()
+
+    def get_position(self, contract_instance, w3, mission_id):
+        """This drone's position in the formation of mission_id, 0 if it has none."""
+        return contract_instance.functions.getPosition(mission_id, self.account(w3)).call()
     
-    def check_leader_status(self, contract_instance, w3):
-        tx_hash = contract_instance.functions.checkLeaderStatus().transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    def check_leader_status(self, contract_instance, w3, wait=True):
+        """Triggers a leader election if the leader timed out. Returns None (no transaction) while it is alive."""
+        if self.leader_is_alive(contract_instance, w3):
+            return None
+        return self._transact(contract_instance.functions.checkLeaderStatus(), w3, wait)
     
     def leader_is_alive(self, contract_instance, w3):
-        return contract_instance.functions.leaderIsAlive().call({"from": w3.eth.accounts[self.id]})
+        return contract_instance.functions.leaderIsAlive().call({"from": self.account(w3)})
 
-    def submit_battery_level(self, contract_instance, w3, battery):
-        tx_hash = contract_instance.functions.submitBatteryLevel(battery).transact({"from": w3.eth.accounts[self.id]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+    def submit_battery_level(self, contract_instance, w3, battery, wait=True):
+        return self._transact(contract_instance.functions.submitBatteryLevel(battery), w3, wait)
     
     def leader_address(self, contract_instance, w3):
-        return contract_instance.functions.leader().call({"from": w3.eth.accounts[self.id]})
+        return contract_instance.functions.leader().call({"from": self.account(w3)})
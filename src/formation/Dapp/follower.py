@@ -1,123 +1,119 @@
-from web3 import Web3
-import math
+from web3.exceptions import ContractLogicError
 import os
 from dotenv import load_dotenv
 from compile import compile_contract
+from rpc import connect, batch_call
+from registry import formation_address
 import sys
-from drone import Follower, Leader
+from drone import Follower, Leader, PREFERENCES_LIMIT
+from monitor import HeartbeatMonitor, LivenessMonitor, run_in_thread
+from cache import ContractCache
+from location import coordinates
+from bitmap import free_positions
+from planner import plan_positions
+from formations import CONTRACT_FORMATIONS, slots, distance_matrix
 
-"""
-    The following three functions return a list of coordinates that correspond to a specific formation. 
-    Available formations in the proposed smart contract are Vee, Line and Ring.
-"""
-
-def create_v_formation(num_drones, spacing):
-    formation = []
-    for i in range(num_drones):
-        x = (i - (num_drones-1)/2) * spacing
-        y = abs(x) * math.tan(math.pi/3)
-        formation.append([x, y])
-    return formation
-
-def create_ring_formation(num_drones, radius):
-    formation = [[0, 0]]
-    for i in range(num_drones-1):
-        angle = 2*math.pi*i/(num_drones-1)
-        x = radius*math.cos(angle)
-        y = radius*math.sin(angle)
-        formation.append([x, y])
-    return formation
-
-def create_line_formation(num_drones, spacing):
-    formation = []
-    for i in range(num_drones):
-        x = i * spacing
-        y = 0
-        formation.append([x, y])
-    return formation
+FORMATION_SPACING = 3 # distance between neighbouring slots of the formations (formations module)
 
 """ The next function can be used to calculate the follower's relative position with respect 
     to leader's position by using the relative_pos method from the Drone class. Assuming that 
-    leader submits his position to the blockchain, it can be retrieved using the get_drone_data 
+    leader submits his position to the blockchain, it can be retrieved with the latest_location 
     method."""
 
 def calculate_rel_pos_leader(follower, leader_add, contract_instance):
-    location = ""
-    data = follower.get_drone_data(contract_instance)
-    for i in range(len(data)):
-        if data[i][3] == leader_add:
-            location = data[i][1]
+    location = follower.latest_location(contract_instance, leader_add)
     rel_pos_x, rel_pos_y = follower.relative_pos(location)
     return (rel_pos_x, rel_pos_y) 
 
-""" Function for calculating euclidean distance between drone's location and a possible position
-    in the formation."""
-
-def eucl_dist(rel_pos, possible_pos):
-    return math.sqrt((rel_pos[0]-possible_pos[0])**2 + (rel_pos[1]-possible_pos[1])**2)
-
 """ The following function is used by drones in order to choose a specific position in the formation. 
     First they call get_available_positions method from Follower class and check which positions in 
     the formation are not occupied. Then by using select_position method from Follower class they can
     submit the position that is closest to them in the blockchain."""
 
-def position_selection(distances, contract_instance, w3, follower):
-    av_positions = follower.get_available_positions(contract_instance)
-    for _ in range(len(av_positions)):
-        min_dist = min(distances)
-        position_to_be_selected = distances.index(min_dist)                    
-        try:
-            follower.select_position(contract_instance, w3, position_to_be_selected + 1)
-            print('Position Submited Successfully in Blockchain')
-            break
-        except:                        
-            pass
-        print("Position " + str(position_to_be_selected+1) + " is already taken or u have already choose")
-        distances[position_to_be_selected] = float('inf')
-    
+def position_selection(distances, contract_instance, w3, follower, planned=None, mission_id=None):
+    # the free positions ranked by distance (planned one first), claimed with a single assignBestAvailable
+    free = follower.available_positions_mask(contract_instance, mission_id)
+    preferences = [position for position in sorted(range(1, len(distances) + 1), key=lambda position: distances[position - 1])
+                   if position != planned and position < len(free) and free[position]]
+    if planned is not None:
+        preferences.insert(0, planned)
+    preferences = preferences[:PREFERENCES_LIMIT]
+    try:
+        _, position = follower.claim_best_position(contract_instance, w3, preferences, mission_id)
+    except (ValueError, ContractLogicError):
+        print("None of the positions is available or u have already choose")
+        return
+    if position == planned:
+        print('Planned Position Submited Successfully in Blockchain')
+    else:
+        print('Position ' + str(position) + ' Submited Successfully in Blockchain')
+
+""" Planning step before the selection: the followers that have no position yet are matched to the free slots 
+    of the formation with the minimum total distance, using the planner module. The plan is built only from 
+    on-chain data (the latest location each follower submitted, relative to the leader's one, and the positions 
+    already held), with the followers sorted by address, so every follower computes the same plan and the planned
+    position is normally still free and gets claimed with a single transaction. None when this follower has not
+    submitted its location yet or already holds a position."""
+
+def plan_position(follower_address, leader_add, peer_addresses, contract_instance, slots, mission_id):
+    # the latest records and positions of the leader and every follower plus the occupancy bitmap, in one JSON-RPC batch
+    functions = contract_instance.functions
+    followers = sorted([follower_address] + list(peer_addresses))
+    results = batch_call(contract_instance.w3, [functions.getLatestData(leader_add)]
+                                               + [functions.getLatestData(address) for address in followers]
+                                               + [functions.getPosition(mission_id, address) for address in followers]
+                                               + [functions.getPositionBitmapFor(mission_id)], default=None)
+    leader_record, records, held = results[0], results[1:len(followers) + 1], results[len(followers) + 1:-1]
+    words, position_count = results[-1]
+    if leader_record is None:
+        raise ContractLogicError("No data submitted by the leader.")
+    x_leader, y_leader = coordinates(leader_record[1])
+    planned_for, rel_positions = [], []
+    for address, record, position in zip(followers, records, held):
+        if record is None or position:
+            continue # no location on-chain yet, or already in the formation
+        x, y = coordinates(record[1])
+        planned_for.append(address)
+        rel_positions.append((x - x_leader, y - y_leader))
+    if follower_address not in planned_for:
+        return None
+    return plan_positions(rel_positions, slots, free_positions(words, position_count))[planned_for.index(follower_address)]
+
 def main():
     """ Loading variables from .env, compiling smart contract and creating an instance,
         declaring a follower object (id, location as string, bettery level), using the 
         above formation functions and retrieve the coordinates list."""
     load_dotenv()
     URL_RPC = os.getenv("URL_RPC")
-    w3 = Web3(Web3.HTTPProvider(URL_RPC))
+    w3 = connect(URL_RPC)
     NUMB_DRONES = int(os.getenv("NUMB_DRONES"))
 
     abi, bytecode = compile_contract()
 
     contract = w3.eth.contract(abi=abi, bytecode=bytecode)
-    contract_address = os.getenv("CONTR_ADD")
+    contract_address = formation_address(w3) # CONTR_ADD, or SWARM_ID's formation in the registry
 
     contract_instance = w3.eth.contract(address=contract_address, abi=abi)
     follower_1 = Follower(1, "31.3, 49.2", 95) #For each follower in terminals, modify the attributes as u wish(id, location, battery).
                                                #For instance follower_2 = Follower(2, "32.1, 47.2", 89) etc...                             
     leader_add = w3.eth.accounts[0]
     rel_pos = calculate_rel_pos_leader(follower_1, leader_add, contract_instance)
-    
-    positions_V = create_v_formation(NUMB_DRONES,3)
-    positions_V.remove([0, 0])
-    positions_Ring = create_ring_formation(NUMB_DRONES,3)
-    positions_Ring.remove([0, 0])
-    positions_Line = create_line_formation(NUMB_DRONES,3)
-    positions_Line.remove([0, 0])
-
-    distances_V = []
-    distances_Ring = []
-    distances_Line = []
-    for pos in positions_V:
-        distances_V.append(eucl_dist(rel_pos, pos))
-    for pos in positions_Ring:
-        distances_Ring.append(eucl_dist(rel_pos, pos))
-    for pos in positions_Line:
-        distances_Line.append(eucl_dist(rel_pos, pos))
 
     """ A simple UI to test smart contract functions acting as a follower. 
         If the leader is down,the election process takes place, and the drone 
         with the highest battery becomes the new leader."""
+    follower_address = w3.eth.accounts[follower_1.id]
+    peer_addresses = [address for address in w3.eth.accounts[1:NUMB_DRONES] if address != follower_address]
+    # the leader's heartbeat deadline is watched in the background, an election is only sent once it passed
+    liveness = LivenessMonitor(follower_1, contract_instance, w3,
+                               on_election=lambda leader: print(f"\n[-] Leader timed out, new leader: {leader}"))
+    run_in_thread(liveness)
+    heartbeats = None # started once this drone is elected leader
+    cache = ContractCache(w3, contract_instance) # missions from memory until an event changes them
     while True:
         print("\nChecking who is the leader...")
-        if follower_1.leader_address(contract_instance, w3) != w3.eth.accounts[follower_1.id]:
+        snapshot = follower_1.get_snapshot(contract_instance) # leader, liveness, mission, positions in one call
+        if snapshot.leader != follower_address:
             print(f"[-] Drone with ID={follower_1.id}, is not the leader...")
             print("Submitting Battery Level...")
             follower_1.set_battery(follower_1.battery - 1)
@@ -136,15 +132,18 @@ def main():
             match choice:
                 case 1: 
                     missionID = int(input('Mission ID?:'))
-                    missionFormation = int(follower_1.get_mission(contract_instance, missionID)[2])
-                    if missionFormation == 1:
-                        position_selection(distances_V, contract_instance, w3, follower_1)
-                    elif missionFormation == 0:
-                        position_selection(distances_Line, contract_instance, w3, follower_1)                            
-                    elif missionFormation == 2:
-                        position_selection(distances_Ring, contract_instance, w3, follower_1)  
-                    else:
-                        print("Error")                  
+                    missionFormation = int(cache.get_mission(missionID)[2])
+                    if missionFormation not in CONTRACT_FORMATIONS:
+                        print("Error")
+                        continue
+                    formation_slots = slots(CONTRACT_FORMATIONS[missionFormation], NUMB_DRONES, FORMATION_SPACING)
+                    distances = distance_matrix(rel_pos, formation_slots)[0].tolist()
+                    try:
+                        planned = plan_position(follower_address, leader_add, peer_addresses, contract_instance, formation_slots, missionID)
+                    except ContractLogicError:
+                        planned = None # the leader has not submitted its location, ranking by distance only
+                        print("No plan without the leader's location, choosing the closest free position")
+                    position_selection(distances, contract_instance, w3, follower_1, planned, missionID)
                 case 2:
                     location = str(input('Location: '))
                     data = str(input('Data: '))
@@ -152,34 +151,38 @@ def main():
                     print(f'Data Stored Successfully in Blockchain')
                 case 3:
                     print()
-                    print(follower_1.get_drone_data(contract_instance))
+                    for record in follower_1.iter_drone_data(contract_instance):
+                        print(record)
                 case 4:
                     print('The available positions are:')
                     print(follower_1.get_available_positions(contract_instance))
                 case 5:
                     missionID = int(input('Mission ID?:'))
-                    print(follower_1.get_mission(contract_instance, missionID))
+                    print(cache.get_mission(missionID))
                 case 6:
                     print("Checking if leader is up...")
                     follower_1.check_leader_status(contract_instance, w3)
-                    if follower_1.leader_address(contract_instance, w3) == w3.eth.accounts[0]:
+                    leader = follower_1.get_snapshot(contract_instance).leader
+                    if leader == leader_add:
                         print("[+] Leader is UP.")
                     else:
                         print(f"[-] Leader is DOWN, New Leader Has Been Elected.")    
-                        print(f"Leader's Address: {follower_1.leader_address(contract_instance, w3)}")
+                        print(f"Leader's Address: {leader}")
                 case 7:
                     print('Exciting...')
                     sys.exit(0)
 
-        """ The options' menu changes in the event that the follower becomes the new leader after 
-            the election process takes place."""
         else:
+            """ The options' menu changes in the event that the follower becomes the new leader after 
+                the election process takes place."""
             print(f"[+] Drone with ID={follower_1.id}, is the leader")
-            lead = Leader(follower_1.id, follower_1.loaction, follower_1.battery)
-
-            print("Sending HeartBeat Signal...")
-            tx = lead.send_heartbeat(contract_instance, w3)
-            print(f"[+] Signal Sent Successfully\n")
+            if heartbeats is None:
+                # as in leader.py, the heartbeat is sent in the background, paced by heartbeatTimeout
+                lead = Leader(follower_1.id, follower_1.location, follower_1.battery)
+                liveness.stop()
+                heartbeats = HeartbeatMonitor(lead, contract_instance, w3)
+                run_in_thread(heartbeats)
+                print(f"[+] Heartbeat monitor started\n")
 
             print("Submitting Battery Level...")
             lead.set_battery(lead.battery - 1)
@@ -0,0 +1,102 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+"""
+    Formation geometry. Every formation is built as a NumPy array of [x, y] coordinates relative to the
+    leader (the leader's own slot is [0, 0]) and memoised by (type, number of drones, spacing), so that
+    slot planning does not rebuild the same coordinates on every start. The returned arrays are read-only
+    because they are shared between callers.
+
+    New formations can be added with the register_formation decorator:
+
+        @register_formation("wedge")
+        def wedge(num_drones, spacing): ...
+"""
+
+FORMATIONS = {}
+
+# FormationType enum of the smart contract
+CONTRACT_FORMATIONS = {0: "line", 1: "v", 2: "ring"}
+
+
+def register_formation(name):
+    def decorator(builder):
+        FORMATIONS[name] = builder
+        return builder
+    return decorator
+
+
+@register_formation("v")
+def v_formation(num_drones, spacing):
+    x = (np.arange(num_drones) - (num_drones - 1) / 2) * spacing
+    return np.column_stack((x, np.abs(x) * math.tan(math.pi / 3)))
+
+
+@register_formation("ring")
+def ring_formation(num_drones, radius):
+    angles = 2 * math.pi * np.arange(num_drones - 1) / max(num_drones - 1, 1)
+    ring = np.column_stack((radius * np.cos(angles), radius * np.sin(angles)))
+    return np.vstack(([[0.0, 0.0]], ring))
+
+
+@register_formation("line")
+def line_formation(num_drones, spacing):
+    return np.column_stack((np.arange(num_drones) * spacing, np.zeros(num_drones)))
+
+
+@register_formation("grid")
+def grid_formation(num_drones, spacing):
+    columns = math.ceil(math.sqrt(num_drones))
+    i = np.arange(num_drones)
+    return np.column_stack((i % columns, i // columns)) * float(spacing)
+
+
+@register_formation("echelon")
+def echelon_formation(num_drones, spacing):
+    # every drone one spacing behind and to the right of the previous one, at 45 degrees
+    steps = np.arange(num_drones) * spacing / math.sqrt(2)
+    return np.column_stack((steps, steps))
+
+
+@register_formation("diamond")
+def diamond_formation(num_drones, spacing):
+    # nested diamond shells around the leader, shell k holds the 4k lattice points with |x| + |y| = k
+    coords = [(0, 0)]
+    k = 1
+    while len(coords) < num_drones:
+        for t in range(k):
+            coords.extend([(k - t, t), (-t, k - t), (t - k, -t), (t, t - k)])
+        k += 1
+    return np.asarray(coords[:num_drones], dtype=float) * spacing
+
+
+@lru_cache(maxsize=128)
+def formation(kind, num_drones, spacing):
+    """All the coordinates of the formation, including the leader's [0, 0]."""
+    coords = np.asarray(FORMATIONS[kind](num_drones, spacing), dtype=float).reshape(-1, 2)
+    coords.setflags(write=False)
+    return coords
+
+
+@lru_cache(maxsize=128)
+def slots(kind, num_drones, spacing):
+    """Coordinates of the followers' slots (the leader's [0, 0] removed), slots[k] is on-chain position k+1."""
+    coords = formation(kind, num_drones, spacing)
+    origin = np.flatnonzero(np.all(coords == 0, axis=1))
+    if len(origin):
+        coords = np.delete(coords, origin[0], axis=0)
+    coords.setflags(write=False)
+    return coords
+
+
+def distance_matrix(rel_positions, slot_coords):
+    """Euclidean distance of every drone (rows) to every slot (columns), in one vectorised pass."""
+    rel_positions = np.asarray(rel_positions, dtype=float).reshape(-1, 2)
+    slot_coords = np.asarray(slot_coords, dtype=float).reshape(-1, 2)
+    return np.hypot(rel_positions[:, None, 0] - slot_coords[None, :, 0], rel_positions[:, None, 1] - slot_coords[None, :, 1])
+
+
+def rank_slots(rel_pos, slot_coords):
+    """On-chain positions (slot index + 1) ordered from the closest to the farthest slot from rel_pos."""
+    return (np.argsort(distance_matrix(rel_pos, slot_coords)[0], kind="stable") + 1).tolist()
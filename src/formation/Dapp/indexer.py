@@ -0,0 +1,286 @@
+from web3 import Web3
+from eth_utils import event_abi_to_log_topic
+import sqlite3
+import time
+import os
+from dotenv import load_dotenv
+from rpc import connect, LOG_BATCH_SIZE
+from compile import compile_contract
+from registry import formation_address
+
+"""
+    Event-sourced local mirror of the LeaderFormation contract. The indexer replays the contract's
+    events with bulk eth_getLogs requests over block ranges, applies them to an embedded SQLite
+    store and saves the last indexed block as a checkpoint. Leader and follower code can then answer
+    reads (drones, positions, missions, submitted data) locally, and a drone that joins mid-mission
+    only has to catch up from the checkpoint instead of replaying the whole chain.
+
+    The mission details and the leader are read at the last block of every range (getMission/leader
+    with block_identifier), so catching up on blocks older than the node's state history (about 128
+    blocks on a default geth full node) needs an archive node, a pruned node fails these reads with
+    "missing trie node". Reads of the live swarm should still go to the contract, the store lags the
+    chain by up to one sync.
+
+    The checkpoint keeps the hash of its block. A range is committed only if the hash of its last block
+    did not change while it was applied, and a sync first checks that the checkpoint block is still on
+    the canonical chain. The store is not versioned per block, so after a reorg below the checkpoint it
+    is cleared and replayed from start_block.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (id INTEGER PRIMARY KEY CHECK (id = 0), block INTEGER NOT NULL, hash TEXT,
+                                       start_block INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS drones (address TEXT PRIMARY KEY, active INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS positions (epoch INTEGER NOT NULL, address TEXT NOT NULL, position INTEGER NOT NULL,
+                                      PRIMARY KEY (epoch, address));
+CREATE TABLE IF NOT EXISTS missions (id INTEGER PRIMARY KEY, name TEXT, mission_type INTEGER, formation_type INTEGER,
+                                     active INTEGER NOT NULL DEFAULT 0, epoch INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS drone_data (idx INTEGER PRIMARY KEY, block INTEGER NOT NULL, timestamp INTEGER,
+                                       submitter TEXT NOT NULL, location TEXT, data TEXT);
+CREATE INDEX IF NOT EXISTS drone_data_submitter ON drone_data (submitter, idx);
+"""
+INDEXED_TABLES = ("state", "drones", "positions", "missions", "drone_data")
+
+
+class Reorg(Exception):
+    """The last block of a range changed while the range was applied."""
+
+
+class Indexer:
+    """
+    Mirrors the contract state into a SQLite database.
+
+    Attributes: w3 (Web3 connection)
+                contract_instance (deployed LeaderFormation)
+                db (sqlite3 connection of the local store)
+    """
+
+    def __init__(self, w3, contract_instance, db_path="formation_index.db", start_block=0, batch_size=LOG_BATCH_SIZE) -> None:
+        self.w3 = w3
+        self.contract_instance = contract_instance
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        self.db.execute("INSERT OR IGNORE INTO checkpoint (id, block, start_block) VALUES (0, ?, ?)", (start_block - 1, start_block))
+        self.db.commit()
+        self._events = {}
+        for entry in contract_instance.abi:
+            if entry.get("type") == "event":
+                self._events[event_abi_to_log_topic(entry)] = getattr(contract_instance.events, entry["name"])()
+        self._handlers = {
+            "DroneAdded": self._on_drone_added,
+            "DroneRemoved": self._on_drone_removed,
+            "PositionAssigned": self._on_position_assigned,
+            "PositionReleased": self._on_position_released,
+            "PositionsReset": self._on_positions_reset,
+            "MissionCreated": self._on_mission_changed,
+            "MissionUpdated": self._on_mission_changed,
+            "MissionActivated": self._on_mission_activated,
+            "MissionDeactivated": self._on_mission_deactivated,
+            "DataSubmitted": self._on_data_submitted,
+        }
+
+    @property
+    def checkpoint(self):
+        """Last block whose events are already applied to the store."""
+        return self.db.execute("SELECT block FROM checkpoint WHERE id = 0").fetchone()[0]
+
+    def sync(self, to_block=None):
+        """Replays the events from the checkpoint up to to_block (latest by default). Returns the number of applied events."""
+        if to_block is None:
+            to_block = self.w3.eth.block_number
+        if not self._checkpoint_is_canonical():
+            self.reset()
+        applied = 0
+        from_block = self.checkpoint + 1
+        while from_block <= to_block:
+            end_block = min(from_block + self.batch_size - 1, to_block)
+            try:
+                applied += self._apply_range(from_block, end_block)
+            except Reorg:
+                if not self._checkpoint_is_canonical():
+                    self.reset()
+                    from_block = self.checkpoint + 1
+                continue # the range is fetched again from the new chain
+            from_block = end_block + 1
+        return applied
+
+    def _apply_range(self, from_block, end_block):
+        end_hash = self._block_hash(end_block)
+        logs = self.w3.eth.get_logs({
+            "address": self.contract_instance.address,
+            "fromBlock": from_block,
+            "toBlock": end_block,
+            "topics": [[Web3.to_hex(topic) for topic in self._events]],
+        })
+        applied = 0
+        # each block range is applied in a single sqlite transaction together with its checkpoint
+        with self.db:
+            dirty_missions = set()
+            for log in logs:
+                event = self._events.get(bytes(log["topics"][0]))
+                if event is None:
+                    continue
+                decoded = event.process_log(log)
+                handler = self._handlers.get(decoded["event"])
+                if handler is not None:
+                    handler(decoded, dirty_missions)
+                    applied += 1
+            for mission_id in dirty_missions:
+                self._refresh_mission(mission_id, end_block)
+            if logs:
+                # read at the end of the range, not the latest state, while catching up
+                self._set_state("leader", self.contract_instance.functions.leader().call(block_identifier=end_block))
+            # the logs and the reads above all belong to the chain ending in end_hash if it is still there,
+            # the hash covers every earlier block of the range
+            if self._block_hash(end_block) != end_hash:
+                raise Reorg(end_block) # rolls the range back
+            self.db.execute("UPDATE checkpoint SET block = ?, hash = ? WHERE id = 0", (end_block, end_hash))
+        return applied
+
+    def _block_hash(self, block):
+        return Web3.to_hex(self.w3.eth.get_block(block)["hash"])
+
+    def _checkpoint_is_canonical(self):
+        block, block_hash = self.db.execute("SELECT block, hash FROM checkpoint WHERE id = 0").fetchone()
+        return block_hash is None or self._block_hash(block) == block_hash
+
+    def reset(self):
+        """Clears the store, the next sync replays the events from start_block."""
+        with self.db:
+            for table in INDEXED_TABLES:
+                self.db.execute(f"DELETE FROM {table}")
+            self.db.execute("UPDATE checkpoint SET block = start_block - 1, hash = NULL WHERE id = 0")
+
+    def follow(self, poll_interval=2.0):
+        """Keeps the store up to date with the new blocks, forever."""
+        while True:
+            self.sync()
+            time.sleep(poll_interval)
+
+    # Event handlers
+    def _on_drone_added(self, event, dirty_missions):
+        self.db.execute("INSERT OR REPLACE INTO drones (address, active) VALUES (?, 1)", (event["args"]["drone"],))
+
+    def _on_drone_removed(self, event, dirty_missions):
+        self.db.execute("INSERT OR REPLACE INTO drones (address, active) VALUES (?, 0)", (event["args"]["drone"],))
+
+    def _on_position_assigned(self, event, dirty_missions):
+        args = event["args"]
+        self.db.execute("INSERT OR REPLACE INTO positions (epoch, address, position) VALUES (?, ?, ?)",
+                        (args["epoch"], args["drone"], args["position"]))
+
+    def _on_position_released(self, event, dirty_missions):
+        self.db.execute("DELETE FROM positions WHERE epoch = ? AND address = ?", (event["args"]["epoch"], event["args"]["drone"]))
+
+    def _on_positions_reset(self, event, dirty_missions):
+        self.db.execute("INSERT OR IGNORE INTO missions (id) VALUES (?)", (event["args"]["missionId"],))
+        self.db.execute("UPDATE missions SET epoch = ? WHERE id = ?", (event["args"]["epoch"], event["args"]["missionId"]))
+
+    def _on_mission_changed(self, event, dirty_missions):
+        # MissionCreated/Updated only carry the id, the details are fetched once per block range.
+        dirty_missions.add(event["args"]["missionId"])
+
+    def _on_mission_activated(self, event, dirty_missions):
+        self._set_mission_active(event["args"]["missionId"], 1)
+        self._set_state("active_mission", event["args"]["missionId"])
+
+    def _on_mission_deactivated(self, event, dirty_missions):
+        self._set_mission_active(event["args"]["missionId"], 0)
+        self.db.execute("DELETE FROM state WHERE key = 'active_mission' AND value = ?", (event["args"]["missionId"],))
+
+    def _on_data_submitted(self, event, dirty_missions):
+        args = event["args"]
+        self.db.execute("INSERT OR REPLACE INTO drone_data (idx, block, timestamp, submitter, location, data) VALUES (?, ?, ?, ?, ?, ?)",
+                        (args["index"], event["blockNumber"], args["timestamp"], args["submitter"], args["location"], args["data"]))
+
+    def _set_mission_active(self, mission_id, active):
+        self.db.execute("INSERT OR IGNORE INTO missions (id, active) VALUES (?, 0)", (mission_id,))
+        self.db.execute("UPDATE missions SET active = ? WHERE id = ?", (active, mission_id))
+
+    def _refresh_mission(self, mission_id, block):
+        name, mission_type, formation_type, active = self.contract_instance.functions.getMission(mission_id).call(block_identifier=block)
+        self.db.execute("""INSERT INTO missions (id, name, mission_type, formation_type, active) VALUES (?, ?, ?, ?, ?)
+                           ON CONFLICT (id) DO UPDATE SET name = excluded.name, mission_type = excluded.mission_type,
+                           formation_type = excluded.formation_type, active = excluded.active""",
+                        (mission_id, name, mission_type, formation_type, int(active)))
+
+    def _set_state(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    # Local reads
+    def leader(self):
+        row = self.db.execute("SELECT value FROM state WHERE key = 'leader'").fetchone()
+        return row[0] if row else None
+
+    def drones(self):
+        return [row[0] for row in self.db.execute("SELECT address FROM drones WHERE active = 1")]
+
+    def is_drone(self, address):
+        row = self.db.execute("SELECT active FROM drones WHERE address = ?", (address,)).fetchone()
+        return bool(row and row[0])
+
+    def active_mission(self):
+        row = self.db.execute("SELECT value FROM state WHERE key = 'active_mission'").fetchone()
+        return int(row[0]) if row else None
+
+    def epoch(self, mission_id=None):
+        """Position table of mission_id, or of the active mission (0 while none is active)."""
+        if mission_id is None:
+            mission_id = self.active_mission()
+            if mission_id is None:
+                return 0
+        row = self.db.execute("SELECT epoch FROM missions WHERE id = ?", (mission_id,)).fetchone()
+        return row[0] if row else 0
+
+    def position(self, address, mission_id=None):
+        row = self.db.execute("SELECT position FROM positions WHERE epoch = ? AND address = ?", (self.epoch(mission_id), address)).fetchone()
+        return row[0] if row else 0
+
+    def taken_positions(self, mission_id=None):
+        rows = self.db.execute("SELECT position, address FROM positions WHERE epoch = ?", (self.epoch(mission_id),))
+        return {row[0]: row[1] for row in rows}
+
+    def get_mission(self, mission_id):
+        """Same tuple as the getMission view: (name, missionType, formationType, active)."""
+        row = self.db.execute("SELECT name, mission_type, formation_type, active FROM missions WHERE id = ?", (mission_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], row[2], bool(row[3])
+
+    def active_missions(self):
+        return [row[0] for row in self.db.execute("SELECT id FROM missions WHERE active = 1 ORDER BY id")]
+
+    def latest_location(self, address):
+        row = self.db.execute("SELECT location FROM drone_data WHERE submitter = ? ORDER BY idx DESC LIMIT 1", (address,)).fetchone()
+        return row[0] if row else None
+
+    def iter_drone_data(self, submitter=None):
+        """Yields (timestamp, location, data, submitter) records, like the contract's droneData."""
+        if submitter is None:
+            rows = self.db.execute("SELECT timestamp, location, data, submitter FROM drone_data ORDER BY idx")
+        else:
+            rows = self.db.execute("SELECT timestamp, location, data, submitter FROM drone_data WHERE submitter = ? ORDER BY idx", (submitter,))
+        for row in rows:
+            yield tuple(row)
+
+
+def main():
+    """ Runs the indexer as a standalone process, e.g. next to the leader and followers.
+        INDEX_DB and INDEX_START_BLOCK can be set in .env."""
+    load_dotenv()
+    URL_RPC = os.getenv("URL_RPC")
+    w3 = connect(URL_RPC)
+
+    abi, bytecode = compile_contract()
+    contract_instance = w3.eth.contract(address=formation_address(w3), abi=abi) # CONTR_ADD, or SWARM_ID's formation in the registry
+
+    indexer = Indexer(w3, contract_instance, os.getenv("INDEX_DB", "formation_index.db"), int(os.getenv("INDEX_START_BLOCK", "0")))
+    print(f"Catching up from block {indexer.checkpoint + 1}...")
+    print(f"[+] {indexer.sync()} events applied, checkpoint at block {indexer.checkpoint}")
+    indexer.follow()
+
+
+if __name__ == '__main__':
+    main()
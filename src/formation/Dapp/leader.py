@@ -1,45 +1,52 @@
-from web3 import Web3
 #import json
 import os
 from dotenv import load_dotenv
 from compile import compile_contract
+from rpc import connect
+from registry import formation_address
 import sys
 from drone import Leader
+from signer import LocalSigner
+from receipts import tracker_for
+from monitor import HeartbeatMonitor, run_in_thread
 
 
 def main():
-  """ Before running follower.py, it is necessary to run this file and add some drones to the swarm with 
-      option 1. Next, submit the leader's location using option 7. After, create a mission and declare a specific 
-      formation with option 3. Finally, activate the mission and run the follower.py files in separate terminals.
-      This procedure could be automated, but I decided to use an UI to see how it works by following
-      all the steps one by one. Drone registration, mission creation and activation, position selecting 
-      and the creation of the formation processes are automated in the gazebo sim.   
-  """
+    """ Before running follower.py, it is necessary to run this file and add some drones to the swarm with 
+        option 1. Next, submit the leader's location using option 7. After, create a mission and declare a specific 
+        formation with option 3. Finally, activate the mission and run the follower.py files in separate terminals.
+        This procedure could be automated, but I decided to use an UI to see how it works by following
+        all the steps one by one. Drone registration, mission creation and activation, position selecting 
+        and the creation of the formation processes are automated in the gazebo sim.   
+    """
     load_dotenv()
     URL_RPC = os.getenv("URL_RPC")
     NUMB_DRONES = int(os.getenv("NUMB_DRONES"))
-    w3 = Web3(Web3.HTTPProvider(URL_RPC))
+    w3 = connect(URL_RPC)
 
     abi, bytecode = compile_contract()
 
     contract = w3.eth.contract(abi=abi, bytecode=bytecode)
-    contract_address = os.getenv("CONTR_ADD")
+    contract_address = formation_address(w3) # CONTR_ADD, or SWARM_ID's formation in the registry
     contract_instance = w3.eth.contract(address=contract_address, abi=abi)
 
-    lead = Leader(0, "32.4, 51.2", 97) #This can be modified
+    private_key = os.getenv("PRIVATE_KEY") # sign locally instead of using the node's unlocked account 0
+    tracker = tracker_for(w3) # one block-driven loop resolves the receipts of every pending transaction
+    signer = LocalSigner(w3, private_key, tracker=tracker) if private_key else None
+    lead = Leader(0, "32.4, 51.2", 97, signer=signer, tracker=tracker) #This can be modified
     drone_add = []
     for i in range(1, NUMB_DRONES):
         drone_add.append(w3.eth.accounts[i])
+
+    # heartbeats are sent in the background on a schedule, not once per menu choice
+    heartbeats = HeartbeatMonitor(lead, contract_instance, w3)
+    run_in_thread(heartbeats)
     
     while True:
-        print("Sending HeartBeat Signal...")
-        tx = lead.send_heartbeat(contract_instance, w3)
-        print(f"[+] Signal Sent Successfully\n")
-
         print("Submitting Battery Level...")
         lead.set_battery(lead.battery - 1)
         lead.submit_battery_level(contract_instance, w3, lead.battery)
-        print("[+] Battery Level Submited Succesfully\n")
+        print(f"[+] Battery Level Submited Succesfully (heartbeat every {heartbeats.period:.0f}s)\n")
 
         print(""" What to do? 
                   1. Add drones in the swarm
@@ -53,9 +60,10 @@ def main():
         choice = int(input('\n> '))
         match choice:
             case 1:
+                tx_recs = lead.add_drones(contract_instance, w3, drone_add)
                 for drone in drone_add:
-                    tx_rec=lead.add_drone(contract_instance, w3, drone)
                     print(f'\n\nDrone - {drone} Added Successfully.')
+                print(f'{len(drone_add)} drones registered with {len(tx_recs)} transaction(s).')
             case 2:
                 drone = str(input('Give the address of the drone u want to remove: '))
                 tx = lead.remove_drone(contract_instance, w3, drone)
@@ -103,6 +111,7 @@ def main():
                 tx = lead.submit_data(contract_instance, w3, location, data)
                 print(f'Data Stored Successfully in Blockchain')
             case 8:
+                print(f'Inclusion latency: {tracker.stats()}')
                 print('Exciting...')
                 sys.exit(0)
 
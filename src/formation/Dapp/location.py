@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+"""
+    Codec for drone locations. The contract's packed format stores latitude and longitude in
+    micro-degrees and altitude in centimetres as int32 values inside one uint96:
+
+        (lat << 64) | (lon << 32) | alt
+
+    The legacy "lat, lon" string format (e.g. "31.3, 49.2") is still parsed, with the result
+    memoised since the same strings are parsed over and over in the control loops.
+"""
+
+DEGREE_SCALE = 1000000 # micro-degrees
+ALTITUDE_SCALE = 100 # centimetres
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+UINT32_MASK = 2**32 - 1
+
+
+def _to_int32(value, scale):
+    scaled = round(value * scale)
+    if not INT32_MIN <= scaled <= INT32_MAX:
+        raise ValueError(f"{value} does not fit into the packed location format")
+    return scaled & UINT32_MASK
+
+
+def _from_int32(word, scale):
+    if word > INT32_MAX:
+        word -= 2**32
+    return word / scale
+
+
+def encode(lat, lon, alt=0.0):
+    """(lat, lon[, alt]) in degrees/metres -> packed uint96."""
+    return (_to_int32(lat, DEGREE_SCALE) << 64) | (_to_int32(lon, DEGREE_SCALE) << 32) | _to_int32(alt, ALTITUDE_SCALE)
+
+
+def decode(packed):
+    """Packed uint96 -> (lat, lon, alt)."""
+    return (_from_int32((packed >> 64) & UINT32_MASK, DEGREE_SCALE),
+            _from_int32((packed >> 32) & UINT32_MASK, DEGREE_SCALE),
+            _from_int32(packed & UINT32_MASK, ALTITUDE_SCALE))
+
+
+@lru_cache(maxsize=1024)
+def parse(location):
+    """Legacy "lat, lon" string -> (lat, lon)."""
+    lat, lon = location.split(", ")
+    return float(lat), float(lon)
+
+
+def coordinates(location):
+    """(lat, lon) of a location given either as a legacy string or as a coordinate tuple."""
+    if isinstance(location, str):
+        return parse(location)
+    return location[0], location[1]
@@ -0,0 +1,140 @@
+import asyncio
+import inspect
+import threading
+import time
+
+"""
+    Background heartbeat and liveness monitors. The contract derives the leader's liveness from its
+    last heartbeat (the leaderIsAlive view), so watching the leader costs no gas and only a timed out
+    leader is worth a checkLeaderStatus transaction.
+
+    HeartbeatMonitor is the leader's side: it sends a heartbeat every period, where the period adapts
+    to the contract's heartbeatTimeout and the measured inclusion latency of the previous heartbeats,
+    so the next one is mined before the timeout even on a slow chain.
+
+    LivenessMonitor is the followers' side: it reads the leader's heartbeat deadline and sleeps until
+    it, instead of polling. Once the deadline has passed it sends checkLeaderStatus, which elects a new
+    leader, and reports the new leader to on_election.
+
+    Both work with the synchronous (drone.py) and the asyncio (async_drone.py) drones. The gazebo
+    scripts run them as tasks, the interactive scripts in a background thread:
+
+        run_in_thread(HeartbeatMonitor(lead, contract_instance, w3))
+"""
+
+HEARTBEAT_SHARE = 0.5 # longest heartbeat period, as a share of heartbeatTimeout
+LATENCY_MARGIN = 3 # the period leaves this many inclusion latencies before the timeout
+LATENCY_WEIGHT = 0.3 # weight of the newest sample in the inclusion latency moving average
+MIN_PERIOD = 5 # seconds, shortest heartbeat period and shortest wait between two liveness checks
+CHECK_MARGIN = 2 # seconds a follower waits past the leader's deadline before checking it
+
+
+async def _run(function, *args):
+    """Awaits function(*args), or runs it in a worker thread when it is synchronous."""
+    if inspect.iscoroutinefunction(function):
+        return await function(*args)
+    return await asyncio.to_thread(function, *args)
+
+
+async def _notify(callback, *args):
+    if callback is None:
+        return
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+class HeartbeatMonitor:
+    """
+    Attributes: drone (the leader, a Leader or AsyncLeader)
+                period (seconds until the next heartbeat)
+                latency (moving average of the heartbeats' inclusion latency, in seconds)
+    """
+
+    def __init__(self, drone, contract_instance, w3, on_heartbeat=None) -> None:
+        self.drone = drone
+        self.contract_instance = contract_instance
+        self.w3 = w3
+        self.on_heartbeat = on_heartbeat
+        self.period = MIN_PERIOD
+        self.latency = None
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def next_period(self, timeout):
+        """Heartbeat period for heartbeatTimeout timeout and the current inclusion latency."""
+        period = timeout * HEARTBEAT_SHARE
+        if self.latency is not None:
+            period = min(period, timeout - LATENCY_MARGIN * self.latency)
+        return max(MIN_PERIOD, period)
+
+    async def run(self):
+        timeout = await _run(self.contract_instance.functions.heartbeatTimeout().call)
+        while not self._stopped:
+            started = time.monotonic()
+            try:
+                receipt = await _run(self.drone.send_heartbeat, self.contract_instance, self.w3)
+            except Exception as error:
+                # retried after the shortest period, there is usually time left before the timeout
+                print(f"[!] Heartbeat failed: {error}")
+                self.period = MIN_PERIOD
+            else:
+                latency = time.monotonic() - started
+                self.latency = latency if self.latency is None else LATENCY_WEIGHT * latency + (1 - LATENCY_WEIGHT) * self.latency
+                self.period = self.next_period(timeout)
+                await _notify(self.on_heartbeat, receipt)
+            await asyncio.sleep(self.period)
+
+
+class LivenessMonitor:
+    """
+    Attributes: drone (the watching follower, a Follower or AsyncFollower)
+                leader (leader address as of the last check)
+                deadline (chain timestamp after which the leader counts as timed out)
+    """
+
+    def __init__(self, drone, contract_instance, w3, on_election=None) -> None:
+        self.drone = drone
+        self.contract_instance = contract_instance
+        self.w3 = w3
+        self.on_election = on_election
+        self.leader = None
+        self.deadline = None
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    async def _chain_time(self):
+        block = await _run(self.w3.eth.get_block, "latest")
+        return block["timestamp"]
+
+    async def run(self):
+        functions = self.contract_instance.functions
+        timeout = await _run(functions.heartbeatTimeout().call)
+        self.leader = await _run(functions.leader().call)
+        while not self._stopped:
+            if await _run(functions.leaderIsAlive().call):
+                last_heartbeat = await _run(functions.lastHeartbeat().call)
+                self.deadline = last_heartbeat + timeout
+                wait = self.deadline - await self._chain_time() + CHECK_MARGIN
+                await asyncio.sleep(min(max(MIN_PERIOD, wait), timeout))
+                continue
+            try:
+                await _run(self.drone.check_leader_status, self.contract_instance, self.w3)
+            except Exception as error:
+                print(f"[!] Leader status check failed: {error}")
+            leader = await _run(functions.leader().call)
+            if leader != self.leader:
+                self.leader = leader
+                await _notify(self.on_election, leader)
+            await asyncio.sleep(MIN_PERIOD)
+
+
+def run_in_thread(monitor):
+    """Runs monitor on its own event loop in a daemon thread, for the synchronous scripts."""
+    thread = threading.Thread(target=asyncio.run, args=(monitor.run(),), name=type(monitor).__name__, daemon=True)
+    thread.start()
+    return thread
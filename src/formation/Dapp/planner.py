@@ -0,0 +1,88 @@
+import numpy as np
+from formations import distance_matrix
+
+"""
+    Formation slot planning. Instead of every follower greedily claiming its nearest slot (and retrying
+    after each reverted assignPosition), the planner takes the relative positions of all followers and
+    the formation slots and computes the assignment with the minimum total travel distance (Hungarian
+    algorithm). Every follower runs the same deterministic plan, so in the normal case each one claims
+    its own slot with a single transaction.
+"""
+
+
+def linear_sum_assignment(cost):
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials, O(n^2 m)), the inner scan over the
+    columns is vectorised with NumPy. cost can be rectangular, every row (or column, if there are fewer
+    columns) gets assigned. Returns (row_indexes, column_indexes) sorted by row, like scipy's function.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int) # p[j]: row (1-based) assigned to column j, 0 if the column is free
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_columns = np.nonzero(used)[0]
+            u[p[used_columns]] += delta
+            v[used_columns] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # augmenting along the found path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    columns = np.nonzero(p[1:])[0]
+    rows = p[1:][columns] - 1
+    order = np.argsort(rows)
+    rows, columns = rows[order], columns[order]
+    if transposed:
+        order = np.argsort(columns)
+        rows, columns = columns[order], rows[order]
+    return rows, columns
+
+
+def plan_positions(rel_positions, slots, available=None):
+    """
+    Minimum total distance assignment of drones to formation slots.
+
+    rel_positions: drones' coordinates relative to the leader, one [x, y] per drone
+    slots: formation coordinates without the leader's one, slots[k] is on-chain position k+1
+    available: on-chain positions that are still free (all of them by default)
+
+    Returns a list with the on-chain position planned for each drone, None for the drones left without one.
+    """
+    if available is None:
+        available = range(1, len(slots) + 1)
+    available = np.array(sorted(int(position) for position in available if 0 < position <= len(slots)), dtype=int)
+    plan = [None] * len(rel_positions)
+    if len(plan) == 0 or len(available) == 0:
+        return plan
+    cost = distance_matrix(rel_positions, np.asarray(slots, dtype=float)[available - 1])
+    rows, columns = linear_sum_assignment(cost)
+    for row, column in zip(rows, columns):
+        plan[row] = int(available[column])
+    return plan
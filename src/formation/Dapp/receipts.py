@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+
+"""
+    Block-driven receipt waiter. w3.eth.wait_for_transaction_receipt polls the node once per pending
+    transaction, so a swarm bring-up or a heartbeat storm with N transactions in flight means N polling
+    loops. A ReceiptTracker runs a single loop instead: it follows the chain head, reads every new block
+    once and resolves all the tracked transactions mined in it in one pass. The RPC load depends on the
+    block rate, not on the number of pending transactions.
+
+        tracker = tracker_for(w3)
+        futures = [tracker.track(tx_hash) for tx_hash in tx_hashes]
+        receipts = [future.result() for future in futures]
+
+    Transactions have to be tracked right after they are sent: the tracker only remembers the hashes of
+    the last RECENT_BLOCKS blocks. Every resolved transaction adds its inclusion latency (seconds and blocks between track() and the
+    block that mined it) to the tracker's stats().
+"""
+
+POLL_INTERVAL = 0.5 # seconds between two eth_blockNumber requests
+RECENT_BLOCKS = 16 # mined blocks whose transaction hashes are remembered for late track() calls
+LATENCY_WINDOW = 1024 # resolved transactions the latency stats are computed over
+RECEIPT_TIMEOUT = 120 # seconds wait() gives a transaction before it counts as dropped
+
+
+def _key(tx_hash):
+    return Web3.to_hex(tx_hash)
+
+
+class ReceiptTracker:
+    """
+    Attributes: w3 (Web3 connection)
+                block (last block read by the tracker)
+                pending (number of tracked transactions without a receipt yet)
+    """
+
+    def __init__(self, w3, poll_interval=POLL_INTERVAL) -> None:
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.block = None
+        self._pending = {} # tx hash -> (future, tracked at (seconds), tracked at (block))
+        self._recent = {} # tx hash -> block number, for the last RECENT_BLOCKS blocks
+        self._recent_blocks = deque()
+        self._latencies = deque(maxlen=LATENCY_WINDOW) # (seconds, blocks)
+        self._block_receipts = True # False once the node turned eth_getBlockReceipts down
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def start(self):
+        """Starts following the chain head in a daemon thread (track() does it on first use)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.block is None:
+                # start a few blocks back, in case the first tracked transactions are already mined
+                self.block = max(self.w3.eth.block_number - RECENT_BLOCKS, 0)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def track(self, tx_hash, callback=None):
+        """Future of the transaction's receipt. callback(receipt) runs as soon as it is mined."""
+        self.start()
+        key = _key(tx_hash)
+        with self._lock:
+            if key in self._pending:
+                future = self._pending[key][0]
+            else:
+                future = Future()
+                self._pending[key] = (future, time.monotonic(), self.block)
+            mined_in = self._recent.get(key)
+        if callback is not None:
+            future.add_done_callback(lambda future: callback(future.result()))
+        if mined_in is not None:
+            # mined before it was tracked, e.g. in the block right after it was sent
+            self._resolve(mined_in, [key])
+        return future
+
+    def wait(self, tx_hash, timeout=RECEIPT_TIMEOUT):
+        """Receipt of the transaction, raises TimeExhausted like wait_for_transaction_receipt."""
+        try:
+            return self.track(tx_hash).result(timeout)
+        except FutureTimeout:
+            self.forget(tx_hash)
+            raise TimeExhausted(f"Transaction {_key(tx_hash)} is not in the chain after {timeout} seconds")
+
+    def wait_all(self, tx_hashes, timeout=RECEIPT_TIMEOUT):
+        """Receipts of the transactions, in order, with one deadline for all of them."""
+        futures = [self.track(tx_hash) for tx_hash in tx_hashes]
+        deadline = time.monotonic() + timeout
+        receipts = []
+        for tx_hash, future in zip(tx_hashes, futures):
+            try:
+                receipts.append(future.result(max(0, deadline - time.monotonic())))
+            except FutureTimeout:
+                self.forget(tx_hash)
+                raise TimeExhausted(f"Transaction {_key(tx_hash)} is not in the chain after {timeout} seconds")
+        return receipts
+
+    def forget(self, tx_hash):
+        """Stops tracking a transaction (e.g. one replaced or dropped from the pool)."""
+        with self._lock:
+            self._pending.pop(_key(tx_hash), None)
+
+    def stats(self):
+        """Inclusion latency of the last resolved transactions: count, mean/p50/p95/max seconds and mean blocks."""
+        latencies = list(self._latencies)
+        if not latencies:
+            return {"count": 0}
+        seconds = sorted(latency[0] for latency in latencies)
+        return {
+            "count": len(seconds),
+            "mean": sum(seconds) / len(seconds),
+            "p50": seconds[len(seconds) // 2],
+            "p95": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+            "max": seconds[-1],
+            "mean_blocks": sum(latency[1] for latency in latencies) / len(latencies),
+            "pending": self.pending,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as error:
+                # a failed request is retried on the next tick, the pending futures stay pending
+                print(f"[!] Receipt tracker: {error}")
+            self._stop.wait(self.poll_interval)
+
+    def poll(self):
+        """Reads the blocks mined since the last poll and resolves their tracked transactions."""
+        head = self.w3.eth.block_number
+        while self.block < head:
+            number = self.block + 1
+            block = self.w3.eth.get_block(number)
+            hashes = [_key(tx_hash) for tx_hash in block.transactions]
+            with self._lock:
+                self._remember(number, hashes)
+                mined = [key for key in hashes if key in self._pending]
+            if mined:
+                self._resolve(number, mined)
+            self.block = number
+
+    def _remember(self, number, hashes):
+        self._recent_blocks.append((number, hashes))
+        for key in hashes:
+            self._recent[key] = number
+        while len(self._recent_blocks) > RECENT_BLOCKS:
+            number, hashes = self._recent_blocks.popleft()
+            for key in hashes:
+                self._recent.pop(key, None)
+
+    def _receipts(self, number, keys):
+        """Receipts of the mined transactions, with one eth_getBlockReceipts call where the node has it."""
+        if self._block_receipts and len(keys) > 1:
+            try:
+                return {_key(receipt.transactionHash): receipt for receipt in self.w3.eth.get_block_receipts(number)}
+            except Exception:
+                self._block_receipts = False
+        return {key: self.w3.eth.get_transaction_receipt(key) for key in keys}
+
+    def _resolve(self, number, keys):
+        receipts = self._receipts(number, keys)
+        now = time.monotonic()
+        for key in keys:
+            with self._lock:
+                entry = self._pending.pop(key, None)
+            if entry is None:
+                continue
+            future, tracked_at, tracked_block = entry
+            self._latencies.append((now - tracked_at, number - tracked_block if tracked_block is not None else 0))
+            future.set_result(receipts[key])
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def tracker_for(w3):
+    """ReceiptTracker shared by everything in the process that uses w3."""
+    with _trackers_lock:
+        if id(w3) not in _trackers:
+            _trackers[id(w3)] = ReceiptTracker(w3)
+        return _trackers[id(w3)]
@@ -0,0 +1,213 @@
+from web3 import Web3
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+from dotenv import load_dotenv
+from rpc import connect
+from compile import compile_contract
+from deploy import DATA_CAPACITY
+
+"""
+    Many swarms on one chain. Every swarm runs its own LeaderFormation instance, and the SwarmRegistry
+    contract maps swarm ids (keccak256 of the swarm's name) to their addresses, so scripts find their
+    contract by SWARM_ID instead of a CONTR_ADD pasted into .env.
+
+    SwarmRegistryClient deploys N formations from one account with pipelined nonces: all constructor
+    transactions are sent back to back, their receipts collected afterwards, and the swarms registered
+    with a few registerSwarms batches. drive() then runs one callable per swarm on a thread pool, so a
+    single process can keep many swarms busy at once.
+
+        client = SwarmRegistryClient(w3, os.getenv("REGISTRY_ADD"))
+        client.deploy_swarms([f"swarm-{i}" for i in range(20)])
+        lead = Leader(0, "32.4, 51.2", 97)
+        client.drive(client.names, lambda name, contract_instance: lead.add_drones(contract_instance, w3, drone_add))
+"""
+
+REGISTRY_NAME = "SwarmRegistry"
+REGISTER_BATCH_SIZE = 100 # swarms per registerSwarms transaction
+LOOKUP_PAGE_SIZE = 100 # swarm ids per getSwarmIds call
+
+
+def swarm_id(name):
+    """bytes32 id of a swarm, ids given as 32 bytes are returned unchanged."""
+    if isinstance(name, bytes) and len(name) == 32:
+        return name
+    return Web3.keccak(text=str(name))
+
+
+def _send(w3, transaction, private_key=None):
+    """Sends a transaction (with its nonce already set) from an unlocked node account or signed locally."""
+    if private_key is None:
+        return w3.eth.send_transaction(transaction)
+    signed = w3.eth.account.sign_transaction(transaction, private_key=private_key)
+    raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+    return w3.eth.send_raw_transaction(raw)
+
+
+def _account(w3, account=None, private_key=None):
+    """Sending address: account if given, else the private key's address, else the first node account."""
+    if account:
+        return account
+    if private_key is not None:
+        return w3.eth.account.from_key(private_key).address
+    return w3.eth.accounts[0]
+
+
+def _deploy(w3, contract_name, account=None, private_key=None, args=()):
+    """Deploys contract_name of formation.sol with the constructor arguments args and returns its address."""
+    account = _account(w3, account, private_key)
+    abi, bytecode = compile_contract(contract_name)
+    transaction = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).build_transaction(
+        {"from": account, "nonce": w3.eth.get_transaction_count(account, "pending")})
+    return w3.eth.wait_for_transaction_receipt(_send(w3, transaction, private_key)).contractAddress
+
+
+def deploy_registry(w3, account=None, private_key=None):
+    """Deploys a SwarmRegistry and returns its address."""
+    return _deploy(w3, REGISTRY_NAME, account, private_key)
+
+
+def _swarm_lookup(w3):
+    """getSwarm of SWARM_ID in the registry at REGISTRY_ADD, None unless both are set in .env."""
+    registry_address, name = os.getenv("REGISTRY_ADD"), os.getenv("SWARM_ID")
+    if not (registry_address and name):
+        return None
+    abi, bytecode = compile_contract(REGISTRY_NAME)
+    return w3.eth.contract(address=registry_address, abi=abi).functions.getSwarm(swarm_id(name))
+
+
+def formation_address(w3):
+    """Formation of SWARM_ID in the registry at REGISTRY_ADD when both are set in .env, CONTR_ADD otherwise."""
+    lookup = _swarm_lookup(w3)
+    if lookup is None:
+        return os.getenv("CONTR_ADD")
+    formation, owner, registered_at = lookup.call()
+    return formation
+
+
+async def async_formation_address(w3):
+    """Same as formation_address over an AsyncWeb3, for the gazebo scripts."""
+    lookup = _swarm_lookup(w3)
+    if lookup is None:
+        return os.getenv("CONTR_ADD")
+    formation, owner, registered_at = await lookup.call()
+    return formation
+
+
+class SwarmRegistryClient:
+    """
+    Attributes: w3 (Web3 connection)
+                registry (SwarmRegistry contract instance)
+                account (deployer, i.e. the leader of every swarm it deploys, the key's address when private_key is given)
+                names (swarm names deployed or looked up by this client)
+    """
+
+    def __init__(self, w3, registry_address, account=None, private_key=None) -> None:
+        self.w3 = w3
+        abi, bytecode = compile_contract(REGISTRY_NAME)
+        self.registry = w3.eth.contract(address=registry_address, abi=abi)
+        self.formation_abi, self.formation_bytecode = compile_contract()
+        self.account = _account(w3, account, private_key)
+        self.private_key = private_key
+        self._formations = {} # swarm name -> LeaderFormation instance
+
+    @property
+    def names(self):
+        return list(self._formations)
+
+    def _formation(self, address):
+        return self.w3.eth.contract(address=address, abi=self.formation_abi)
+
+    def _send_pipelined(self, transactions):
+        """Sends the transactions with consecutive nonces without waiting in between, then collects the receipts."""
+        nonce = self.w3.eth.get_transaction_count(self.account, "pending")
+        tx_hashes = [_send(self.w3, dict(transaction, nonce=nonce + i), self.private_key) for i, transaction in enumerate(transactions)]
+        return [self.w3.eth.wait_for_transaction_receipt(tx_hash) for tx_hash in tx_hashes]
+
+    def deploy_swarms(self, names, data_capacity=DATA_CAPACITY):
+        """Deploys and registers one LeaderFormation per name. Returns {name: address}."""
+        names = list(names)
+        constructor = self.w3.eth.contract(abi=self.formation_abi, bytecode=self.formation_bytecode).constructor(data_capacity)
+        gas = constructor.estimate_gas({"from": self.account})
+        transaction = constructor.build_transaction({"from": self.account, "gas": gas, "nonce": 0})
+        receipts = self._send_pipelined([transaction] * len(names))
+        addresses = [receipt.contractAddress for receipt in receipts]
+
+        registrations = []
+        for i in range(0, len(names), REGISTER_BATCH_SIZE):
+            ids = [swarm_id(name) for name in names[i:i + REGISTER_BATCH_SIZE]]
+            registrations.append(self.registry.functions.registerSwarms(ids, addresses[i:i + REGISTER_BATCH_SIZE])
+                                 .build_transaction({"from": self.account, "nonce": 0}))
+        self._send_pipelined(registrations)
+
+        for name, address in zip(names, addresses):
+            self._formations[name] = self._formation(address)
+        return dict(zip(names, addresses))
+
+    def lookup(self, name):
+        """LeaderFormation instance of a swarm, the address is fetched from the registry only once."""
+        if name not in self._formations:
+            formation, owner, registered_at = self.registry.functions.getSwarm(swarm_id(name)).call()
+            self._formations[name] = self._formation(formation)
+        return self._formations[name]
+
+    def lookup_many(self, names):
+        """Same as lookup for many swarms, with a single getFormations call for the unknown ones."""
+        missing = [name for name in names if name not in self._formations]
+        if missing:
+            for name, address in zip(missing, self.registry.functions.getFormations([swarm_id(name) for name in missing]).call()):
+                if int(address, 16) == 0:
+                    raise KeyError(f"Swarm {name} is not registered")
+                self._formations[name] = self._formation(address)
+        return [self._formations[name] for name in names]
+
+    def swarm_ids(self):
+        """Every registered swarm id, streamed page by page."""
+        offset = 0
+        while True:
+            page = self.registry.functions.getSwarmIds(offset, LOOKUP_PAGE_SIZE).call()
+            yield from page
+            if len(page) < LOOKUP_PAGE_SIZE:
+                return
+            offset += len(page)
+
+    def drive(self, names, function, max_workers=8):
+        """Runs function(name, contract_instance) for every swarm concurrently. Returns {name: result}."""
+        names = list(names)
+        contracts = self.lookup_many(names)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(function, names, contracts)
+            return dict(zip(names, results))
+
+
+def main():
+    """ python registry.py registry          deploys a SwarmRegistry (paste its address into .env as REGISTRY_ADD)
+        python registry.py deploy N [PREFIX] deploys and registers N swarms named PREFIX-0 .. PREFIX-(N-1)
+        python registry.py list              prints the registered swarms"""
+    load_dotenv()
+    URL_RPC = os.getenv("URL_RPC")
+    w3 = connect(URL_RPC)
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "registry":
+        print(f"SwarmRegistry deployed to {deploy_registry(w3)}")
+        return
+
+    client = SwarmRegistryClient(w3, os.getenv("REGISTRY_ADD"))
+    match command:
+        case "deploy":
+            n = int(sys.argv[2])
+            prefix = sys.argv[3] if len(sys.argv) > 3 else "swarm"
+            data_capacity = int(os.getenv("DATA_CAPACITY", DATA_CAPACITY))
+            for name, address in client.deploy_swarms([f"{prefix}-{i}" for i in range(n)], data_capacity).items():
+                print(f"{name}: {address}")
+        case "list":
+            ids = list(client.swarm_ids())
+            for id, formation in zip(ids, client.registry.functions.getFormations(ids).call()):
+                print(f"{Web3.to_hex(id)}: {formation}")
+        case _:
+            print(main.__doc__)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import os
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3, AsyncWeb3, providers
+from web3.exceptions import ContractLogicError, Web3TypeError
+from dotenv import load_dotenv
+
+"""
+    Shared RPC transport for the scripts. connect() returns one Web3 per process and URL, over a pooled
+    keep-alive HTTP session (the connections are reused instead of a new TCP/TLS handshake per call, also
+    across the threads of registry.drive). web3 only ships an asyncio WebSocket provider, so ws:// and
+    wss:// URLs are served by async_connect (the gazebo scripts) and refused by connect.
+
+    batch_call() sends a group of independent contract reads as a single JSON-RPC batch request (through
+    w3.batch_requests), e.g. the latest location of every peer, the mission and the occupancy bitmap in
+    one round trip:
+
+        w3 = connect()
+        mission, (words, count) = batch_call(w3, [contract_instance.functions.getMission(0),
+                                                  contract_instance.functions.getPositionBitmap()])
+
+    Providers that cannot batch (eth-tester) fall back to one call per function.
+"""
+
+POOL_SIZE = 32 # keep-alive connections per URL
+RPC_TIMEOUT = 30 # seconds
+RAISE = object() # batch_call default: raise on reverted calls
+LOG_BATCH_SIZE = 2000 # blocks per eth_getLogs request
+
+
+@lru_cache(maxsize=None)
+def _session(url, pool_size=POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=Retry(connect=3, backoff_factor=0.1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def provider(url=None, pool_size=POOL_SIZE):
+    """HTTP provider over a pooled session for url (URL_RPC by default), WebSocket URLs need async_connect."""
+    if url is None:
+        load_dotenv()
+        url = os.getenv("URL_RPC")
+    if url.startswith(("ws://", "wss://")):
+        raise ValueError(f"{url} is a WebSocket URL, which only the asyncio scripts support (async_connect), use http:// or https://")
+    return Web3.HTTPProvider(url, request_kwargs={"timeout": RPC_TIMEOUT}, session=_session(url, pool_size))
+
+
+@lru_cache(maxsize=None)
+def connect(url=None):
+    """Web3 shared by everything in the process that talks to url."""
+    return Web3(provider(url))
+
+
+async def async_connect(url=None):
+    """AsyncWeb3 for the gazebo scripts, over aiohttp's pooled sessions or a persistent WebSocket."""
+    if url is None:
+        load_dotenv()
+        url = os.getenv("URL_RPC")
+    if url.startswith(("ws://", "wss://")):
+        w3 = AsyncWeb3(providers.WebSocketProvider(url))
+        await w3.provider.connect()
+        return w3
+    return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(url, request_kwargs={"timeout": RPC_TIMEOUT}))
+
+
+def batch_call(w3, functions, block="latest", default=RAISE):
+    """
+    Calls the contract functions (e.g. contract_instance.functions.getMission(0)) in one JSON-RPC batch
+    and returns their results in order. A reverted call raises ContractLogicError, or gives default if set.
+    Any other error (transport, node) is raised as it is.
+    """
+    functions = list(functions)
+    if not functions:
+        return []
+    try:
+        with w3.batch_requests() as batch:
+            for function in functions:
+                batch.add(function.call(block_identifier=block))
+            return list(batch.execute())
+    except Web3TypeError:
+        pass # the provider cannot batch
+    except ContractLogicError:
+        if default is RAISE:
+            raise
+        # a batch fails as a whole on the first revert, the calls are repeated one by one to find the reverted ones
+    return [_call(function, block, default) for function in functions]
+
+
+def _call(function, block, default):
+    try:
+        return function.call(block_identifier=block)
+    except ContractLogicError:
+        if default is RAISE:
+            raise
+        return default
@@ -0,0 +1,87 @@
+import threading
+from web3.exceptions import TimeExhausted
+
+"""
+    Local transaction signing. Instead of relying on unlocked node accounts (.transact({"from": ...}),
+    with the node picking every nonce), a LocalSigner signs with the drone's private key and takes the
+    nonces from a NonceManager, a local counter per account. Several transactions of the same account
+    can then be in flight at once, e.g. the leader's heartbeat, battery report and a mission update sent
+    back to back and mined together:
+
+        signer = LocalSigner(w3, os.getenv("PRIVATE_KEY"))
+        lead = Leader(0, "32.4, 51.2", 97, signer=signer)
+        tx_hashes = [lead.send_heartbeat(contract_instance, w3, wait=False),
+                     lead.submit_battery_level(contract_instance, w3, lead.battery, wait=False)]
+        receipts = [signer.wait(tx_hash) for tx_hash in tx_hashes]
+
+    When a transaction never reaches the pool (it reverts while its gas is estimated, or is rejected)
+    or is dropped from it, the counter is resynchronised from the node's pending transaction count.
+"""
+
+RECEIPT_TIMEOUT = 120 # seconds before a transaction counts as dropped
+
+
+class NonceManager:
+    """Thread-safe local nonce counters, one per account, shared by all the signers of a process."""
+
+    def __init__(self, w3) -> None:
+        self.w3 = w3
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def next(self, address):
+        """Reserves the next nonce of address, the first one is fetched from the node."""
+        with self._lock:
+            if address not in self._next:
+                self._next[address] = self.w3.eth.get_transaction_count(address, "pending")
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    def resync(self, address):
+        """Forgets the local counter, the next nonce is fetched from the node again."""
+        with self._lock:
+            self._next.pop(address, None)
+
+
+class LocalSigner:
+    """
+    Signs and sends the transactions of one account.
+
+    Attributes: address (the account's address)
+                nonces (NonceManager handing out the nonces)
+                tracker (ReceiptTracker resolving the receipts, see receipts.py, None to poll per transaction)
+    """
+
+    def __init__(self, w3, private_key, nonces=None, tracker=None) -> None:
+        self.w3 = w3
+        self._account = w3.eth.account.from_key(private_key)
+        self.address = self._account.address
+        self.nonces = nonces or NonceManager(w3)
+        self.tracker = tracker
+        self._chain_id = w3.eth.chain_id
+
+    def send(self, function, gas=None):
+        """Builds, signs and sends function's transaction without waiting for it. Returns its hash."""
+        nonce = self.nonces.next(self.address)
+        transaction = {"from": self.address, "nonce": nonce, "chainId": self._chain_id}
+        if gas is not None:
+            transaction["gas"] = gas
+        try:
+            signed = self._account.sign_transaction(function.build_transaction(transaction))
+            raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            return self.w3.eth.send_raw_transaction(raw)
+        except Exception:
+            # the nonce was not used, the following transactions would be stuck behind the gap
+            self.nonces.resync(self.address)
+            raise
+
+    def wait(self, tx_hash, timeout=RECEIPT_TIMEOUT):
+        """Receipt of a sent transaction. A transaction that is not mined in time is considered dropped."""
+        try:
+            if self.tracker is not None:
+                return self.tracker.wait(tx_hash, timeout)
+            return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+        except TimeExhausted:
+            self.nonces.resync(self.address)
+            raise
@@ -0,0 +1,99 @@
+import numpy as np
+from location import coordinates
+
+"""
+    Columnar state for simulating many drones at once (load tests with hundreds to thousands of drones).
+    Ids, positions, battery levels and assigned slots live in NumPy arrays, so per-tick updates such as
+    battery drain or the relative positions of the whole swarm are single vectorised operations.
+    Drone, Leader and Follower objects are lightweight views over one row of a SwarmState.
+
+        state = SwarmState.simulated(1000, (31.3, 49.2), spread=5)
+        followers = state.drones(Follower)
+        state.drain(1)
+        rel_positions = state.relative_positions((32.4, 51.2))
+"""
+
+
+class SwarmState:
+    """
+    Attributes: ids (drone IDs, i.e. account indexes)
+                positions ([x, y] per drone)
+                battery (battery level per drone)
+                slots (assigned formation position per drone, 0 if none)
+    """
+
+    def __init__(self, capacity=16) -> None:
+        capacity = max(capacity, 1)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._positions = np.zeros((capacity, 2), dtype=np.float64)
+        self._battery = np.zeros(capacity, dtype=np.int16)
+        self._slots = np.zeros(capacity, dtype=np.int32)
+        self._size = 0
+
+    @classmethod
+    def simulated(cls, num_drones, center, spread=1.0, battery=(50, 100), seed=None):
+        """A swarm of num_drones drones (IDs 0..n-1) scattered uniformly around center."""
+        rng = np.random.default_rng(seed)
+        state = cls(num_drones)
+        state._ids[:num_drones] = np.arange(num_drones)
+        state._positions[:num_drones] = np.asarray(center, dtype=float) + rng.uniform(-spread, spread, (num_drones, 2))
+        state._battery[:num_drones] = rng.integers(battery[0], battery[1] + 1, num_drones)
+        state._size = num_drones
+        return state
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    @property
+    def positions(self):
+        return self._positions[:self._size]
+
+    @property
+    def battery(self):
+        return self._battery[:self._size]
+
+    @property
+    def slots(self):
+        return self._slots[:self._size]
+
+    def add(self, id, location, battery, slot=0):
+        """Appends a drone and returns its row."""
+        if self._size == len(self._ids):
+            self._grow(2 * len(self._ids))
+        row = self._size
+        self._ids[row] = id
+        self._positions[row] = coordinates(location)
+        self._battery[row] = battery
+        self._slots[row] = slot
+        self._size += 1
+        return row
+
+    def _grow(self, capacity):
+        for name in ("_ids", "_positions", "_battery", "_slots"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def view(self, row, cls):
+        """Drone object of class cls (Drone, Leader, Follower...) backed by row."""
+        return cls.view(self, row)
+
+    def drones(self, cls):
+        return [cls.view(self, row) for row in range(self._size)]
+
+    # Vectorised updates over the whole swarm (or the given rows)
+    def drain(self, amount=1, rows=slice(None)):
+        battery = self.battery
+        battery[rows] = np.maximum(battery[rows] - amount, 0)
+
+    def move(self, delta, rows=slice(None)):
+        self.positions[rows] += delta
+
+    def relative_positions(self, reference):
+        """Every drone's coordinates relative to reference (e.g. the leader's location), shape (n, 2)."""
+        return self.positions - np.asarray(coordinates(reference), dtype=float)
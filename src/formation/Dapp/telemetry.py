@@ -0,0 +1,247 @@
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import time
+from eth_utils import keccak
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+"""
+    Off-chain telemetry with on-chain commitments. Instead of one submitData transaction (and two
+    strings in storage) per reading, the raw readings are written to a local content-addressed store
+    (sha256 of the reading's canonical JSON) and buffered. Every batch_size readings, the Merkle root of
+    the batch is committed with a single commitBatch(root, count) transaction, so the throughput grows
+    with the batch size instead of being bound by the block rate. Any reading can later be proven to be
+    part of a committed batch with its inclusion proof (verifyReading on the contract).
+
+        store = ContentStore("telemetry_store")
+        submitter = TelemetrySubmitter(lead, contract_instance, w3, store)
+        digest, receipt = submitter.submit("31.3, 49.2", "temperature: 21.5")
+        ...
+        batch_id, leaf, proof = inclusion_proof(store, root, digest)
+        lead.verify_reading(contract_instance, batch_id, leaf, proof)
+
+    The Merkle tree hashes pairs in sorted order (no left/right flags in the proofs) and leaves are
+    double hashed, keccak256(keccak256(reading)), so a leaf can never be confused with an inner node.
+"""
+
+BATCH_SIZE = 256 # readings per commitBatch transaction
+STORE_DIR = "telemetry_store"
+
+
+def encode_reading(submitter, timestamp, location, data):
+    """Canonical bytes of a reading, the same reading always gets the same digest and leaf."""
+    return json.dumps({"submitter": submitter, "timestamp": timestamp, "location": location, "data": data},
+                      sort_keys=True, separators=(",", ":")).encode()
+
+
+def reading_leaf(reading):
+    return keccak(keccak(reading))
+
+
+def hash_pair(a, b):
+    return keccak(a + b) if a < b else keccak(b + a)
+
+
+class MerkleTree:
+    """
+    Merkle tree over a list of leaves. A node without a sibling is carried up to the next level unchanged.
+
+    Attributes: levels (levels[0] are the leaves, levels[-1] is [root])
+    """
+
+    def __init__(self, leaves) -> None:
+        if not leaves:
+            raise ValueError("A Merkle tree needs at least one leaf")
+        self.levels = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def proof(self, index):
+        """Sibling hashes from leaf index up to the root."""
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            index //= 2
+        return proof
+
+
+def verify_proof(leaf, proof, root):
+    """Same check as the contract's verifyReading, without the eth_call."""
+    node = leaf
+    for sibling in proof:
+        node = hash_pair(node, sibling)
+    return node == root
+
+
+class ContentStore:
+    """
+    Local content-addressed store: every blob is saved once under its sha256, sharded by the first
+    two hex digits. Batch manifests (the digests of a committed batch, in leaf order) are saved under
+    the batch's Merkle root.
+    """
+
+    def __init__(self, root_dir=STORE_DIR) -> None:
+        self.root_dir = root_dir
+        os.makedirs(os.path.join(root_dir, "batches"), exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root_dir, digest[:2], digest[2:])
+
+    def put(self, blob):
+        """Saves blob and returns its sha256 hex digest."""
+        digest = hashlib.sha256(blob).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, blob)
+        return digest
+
+    def get(self, digest):
+        with open(self.path(digest), "rb") as file:
+            return file.read()
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def save_batch(self, root, digests, batch_id=None, submitter=None):
+        manifest = {"root": root.hex(), "batch_id": batch_id, "submitter": submitter, "digests": list(digests)}
+        _atomic_write(self._manifest_path(root), json.dumps(manifest).encode())
+
+    def load_batch(self, root):
+        with open(self._manifest_path(root), "rb") as file:
+            return json.loads(file.read())
+
+    def _manifest_path(self, root):
+        if isinstance(root, bytes):
+            root = root.hex()
+        return os.path.join(self.root_dir, "batches", root.removeprefix("0x") + ".json")
+
+
+def _atomic_write(path, blob):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class TelemetryBuffer:
+    """
+    Pending readings of one drone. It only stores and batches the readings, committing the batches
+    is left to the caller, so it serves both the blocking and the asyncio drone API. The readings of a
+    taken batch stay pending until the caller reports it committed(), or failed() to retake them with
+    the next batch.
+    """
+
+    def __init__(self, store, submitter, batch_size=BATCH_SIZE) -> None:
+        self.store = store
+        self.submitter = submitter
+        self.batch_size = batch_size
+        self._digests = []
+        self._leaves = []
+        self._in_flight = 0 # readings of the taken batch, at the front of the pending ones
+
+    def __len__(self):
+        return len(self._digests)
+
+    @property
+    def full(self):
+        return len(self._digests) - self._in_flight >= self.batch_size
+
+    def add(self, location, data, timestamp=None):
+        """Stores a reading (timestamp in milliseconds, now by default) and returns its digest."""
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        reading = encode_reading(self.submitter, timestamp, location, data)
+        digest = self.store.put(reading)
+        self._digests.append(digest)
+        self._leaves.append(reading_leaf(reading))
+        return digest
+
+    def take(self):
+        """(root, digests) of the batch of the pending readings, None if there are none or a batch is already taken."""
+        if self._in_flight or not self._digests:
+            return None
+        self._in_flight = len(self._digests)
+        return MerkleTree(self._leaves).root, list(self._digests)
+
+    def committed(self, root, digests, batch_id):
+        """Removes the readings of the committed batch and saves its manifest with the on-chain id."""
+        self.store.save_batch(root, digests, batch_id, self.submitter)
+        del self._digests[:len(digests)]
+        del self._leaves[:len(digests)]
+        self._in_flight = 0
+
+    def failed(self):
+        """The taken batch was not committed, its readings go into the next batch."""
+        self._in_flight = 0
+
+
+class TelemetrySubmitter:
+    """
+    Buffers the readings of drone and commits a batch as soon as batch_size readings are pending.
+    It blocks on the commits, so it only takes the blocking drones; the asyncio drones (async_drone.py)
+    use a TelemetryBuffer and commit its batches in a task, see gazebo/leader_gazebo.py.
+    """
+
+    def __init__(self, drone, contract_instance, w3, store, batch_size=BATCH_SIZE) -> None:
+        if inspect.iscoroutinefunction(drone.commit_batch):
+            raise TypeError(f"TelemetrySubmitter needs a blocking drone, got {type(drone).__name__}: use a TelemetryBuffer with the asyncio API")
+        self.drone = drone
+        self.contract_instance = contract_instance
+        self.w3 = w3
+        self.buffer = TelemetryBuffer(store, drone.account(w3), batch_size)
+
+    def submit(self, location, data, timestamp=None):
+        """Returns (digest, receipt), the receipt is None unless the reading completed a batch."""
+        digest = self.buffer.add(location, data, timestamp)
+        receipt = self.flush() if self.buffer.full else None
+        return digest, receipt
+
+    def flush(self):
+        """Commits the pending readings, if any, and returns the transaction receipt. A failed commit keeps them pending."""
+        batch = self.buffer.take()
+        if batch is None:
+            return None
+        root, digests = batch
+        try:
+            receipt, batch_id = self.drone.commit_batch(self.contract_instance, self.w3, root, len(digests))
+        except Exception:
+            self.buffer.failed()
+            raise
+        if receipt.status != 1 or batch_id is None:
+            self.buffer.failed()
+            raise ContractLogicError(f"commitBatch reverted in transaction {Web3.to_hex(receipt.transactionHash)}")
+        self.buffer.committed(root, digests, batch_id)
+        return receipt
+
+
+def committed_batch_id(contract_instance, tx_receipt):
+    """Batch id of a commitBatch transaction, from its BatchCommitted event (None if there is none)."""
+    for event in contract_instance.events.BatchCommitted().process_receipt(tx_receipt):
+        return event["args"]["batchId"]
+    return None
+
+
+def inclusion_proof(store, root, digest):
+    """(batch_id, leaf, proof) of the reading with digest in the batch with root, for verifyReading."""
+    manifest = store.load_batch(root)
+    index = manifest["digests"].index(digest)
+    leaves = [reading_leaf(store.get(d)) for d in manifest["digests"]]
+    return manifest["batch_id"], leaves[index], MerkleTree(leaves).proof(index)
@@ -0,0 +1,44 @@
+from deploy import DATA_CAPACITY
+from rpc import connect
+
+"""
+    Helpers shared by the benchmark scripts. Every benchmark deploys its own fresh LeaderFormation
+    from the first node account (e.g. Ganache), so the contract at CONTR_ADD is never touched.
+"""
+
+
+def deploy(w3, abi, bytecode, data_capacity=DATA_CAPACITY):
+    tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(data_capacity).transact({"from": w3.eth.accounts[0]})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+
+def random_addresses(w3, n):
+    return [w3.eth.account.create().address for _ in range(n)]
+
+
+def report(name, receipts, seconds):
+    gas = sum(receipt.gasUsed for receipt in receipts)
+    print(f"{name:<32} txs={len(receipts):<6} gas={gas:<12} time={seconds:.3f}s")
+
+
+def funded_accounts(w3, n, ether=1):
+    """n fresh local accounts, funded by the first node account so they can send transactions."""
+    accounts = [w3.eth.account.create() for _ in range(n)]
+    tx_hashes = [w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": w3.to_wei(ether, "ether")})
+                 for account in accounts]
+    for tx_hash in tx_hashes:
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    return accounts
+
+
+def send_as(w3, account, function):
+    """Signs function's transaction with a local account, sends it and returns its receipt."""
+    transaction = function.build_transaction({
+        "from": account.address,
+        "nonce": w3.eth.get_transaction_count(account.address),
+        "chainId": w3.eth.chain_id,
+    })
+    signed = account.sign_transaction(transaction)
+    raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+    return w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(raw))
@@ -0,0 +1,33 @@
+import sys
+from compile import compile_contract
+from drone import Leader
+from _common import connect, deploy, funded_accounts, send_as
+
+"""
+    Gas of a leader election for growing swarms. Every drone is registered and submits a battery 
+    level, then (with no heartbeat ever sent, so the leader counts as timed out) a follower calls 
+    checkLeaderStatus. The election gas should stay flat as the swarm grows.
+
+    Usage: python bench_election.py [N ...]    (default: 10 50 250)
+"""
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10, 50, 250]
+    w3 = connect()
+    abi, bytecode = compile_contract()
+    lead = Leader(0, "0, 0", 100)
+
+    for n in sizes:
+        contract_instance = deploy(w3, abi, bytecode)
+        accounts = funded_accounts(w3, n)
+        lead.add_drones(contract_instance, w3, [account.address for account in accounts])
+        battery_gas = [send_as(w3, account, contract_instance.functions.submitBatteryLevel(1 + i % 100)).gasUsed
+                       for i, account in enumerate(accounts)]
+        receipt = send_as(w3, accounts[0], contract_instance.functions.checkLeaderStatus())
+        new_leader = contract_instance.functions.leader().call()
+        print(f"drones={n:<6} election gas={receipt.gasUsed:<8} max submitBatteryLevel gas={max(battery_gas):<8} new leader={new_leader}")
+
+
+if __name__ == '__main__':
+    main()
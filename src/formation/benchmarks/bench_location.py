@@ -0,0 +1,59 @@
+import sys
+import time
+from compile import compile_contract
+from drone import Leader
+from location import encode, decode, parse
+from _common import connect, deploy, report
+
+"""
+    Compares the legacy string location (submitData("lat, lon", "")) with the packed fixed-point
+    one (submitLocation(uint96)): gas per submission, and the time to read the leader's location 
+    back and turn it into numbers.
+
+    Usage: python bench_location.py [N]
+"""
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    w3 = connect()
+    abi, bytecode = compile_contract()
+    contract_instance = deploy(w3, abi, bytecode)
+    lead = Leader(0, "47.397606, 8.543060", 100)
+    leader_address = w3.eth.accounts[0]
+    points = [(47.397606 + i * 1e-5, 8.543060 - i * 1e-5) for i in range(n)]
+
+    start = time.perf_counter()
+    receipts = [lead.submit_data(contract_instance, w3, f"{lat}, {lon}", "") for lat, lon in points]
+    report(f"submitData(string) x {n}", receipts, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    receipts = [lead.submit_location(contract_instance, w3, lat, lon) for lat, lon in points]
+    report(f"submitLocation(uint96) x {n}", receipts, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(n):
+        parse.cache_clear()
+        parse(contract_instance.functions.getLatestData(leader_address).call()[1])
+    print(f"{'read + parse string':<32} time={time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    for _ in range(n):
+        decode(contract_instance.functions.getLocation(leader_address).call()[0])
+    print(f"{'read + decode packed':<32} time={time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    for lat, lon in points * 100:
+        parse.cache_clear()
+        parse(f"{lat}, {lon}")
+    print(f"{'parse string (client only)':<32} time={time.perf_counter() - start:.3f}s")
+
+    packed = [encode(lat, lon) for lat, lon in points] * 100
+    start = time.perf_counter()
+    for location in packed:
+        decode(location)
+    print(f"{'decode packed (client only)':<32} time={time.perf_counter() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import sys
+import time
+from compile import compile_contract
+from drone import Leader
+from _common import connect, deploy, random_addresses, report
+
+"""
+    Compares registering N drones one addDrone transaction at a time with the batched
+    Leader.add_drones (addDrones chunked to the block gas limit).
+
+    Usage: python bench_registration.py [N]
+"""
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    w3 = connect()
+    abi, bytecode = compile_contract()
+    lead = Leader(0, "0, 0", 100)
+    addresses = random_addresses(w3, n)
+
+    contract_instance = deploy(w3, abi, bytecode)
+    start = time.perf_counter()
+    receipts = [lead.add_drone(contract_instance, w3, address) for address in addresses]
+    report(f"addDrone x {n}", receipts, time.perf_counter() - start)
+
+    contract_instance = deploy(w3, abi, bytecode)
+    start = time.perf_counter()
+    receipts = lead.add_drones(contract_instance, w3, addresses)
+    report(f"add_drones({n})", receipts, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
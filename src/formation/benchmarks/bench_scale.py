@@ -0,0 +1,67 @@
+import sys
+import time
+from compile import compile_contract
+from drone import Leader, Follower
+from swarm import SwarmState
+from _common import connect, deploy, funded_accounts, random_addresses, send_as
+
+"""
+    Gas and latency of the main paths for swarms far beyond 255 drones. For each size N the swarm is
+    simulated (SwarmState.simulated, row 0 is the leader) and registered with the batched addDrones, a
+    mission is activated, a sample of funded drones claims the highest positions of the formation (the
+    last words of the occupancy bitmap), submits its simulated battery levels and finally triggers a
+    leader election. The rest of the swarm are plain addresses, so only the sample needs signed
+    transactions. Per-transaction gas should stay flat as N grows, and the views
+    should grow with the bitmap size (N / 256 words) rather than N.
+
+    Usage: python bench_scale.py [N ...]    (default: 10 100 1000 5000)
+"""
+
+SAMPLE = 10 # drones that send transactions in each run
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10, 100, 1000, 5000]
+    w3 = connect()
+    abi, bytecode = compile_contract()
+
+    print(f"{'drones':<8}{'register gas':<14}{'register s':<12}{'max assign gas':<16}{'election gas':<14}{'snapshot ms':<13}{'bitmap ms':<10}")
+    for n in sizes:
+        state = SwarmState.simulated(n, (0, 0), seed=n)
+        lead = state.view(0, Leader)
+        observer = state.view(0, Follower)
+        contract_instance = deploy(w3, abi, bytecode)
+        sample = funded_accounts(w3, min(SAMPLE, n - 1))
+        addresses = [account.address for account in sample] + random_addresses(w3, n - 1 - len(sample))
+
+        start = time.perf_counter()
+        receipts = lead.add_drones(contract_instance, w3, addresses)
+        register_seconds = time.perf_counter() - start
+        register_gas = sum(receipt.gasUsed for receipt in receipts)
+
+        lead.create_mission(contract_instance, w3, "scale", 0, 0)
+        lead.activate_mission(contract_instance, w3, 0)
+        drone_count = contract_instance.functions.droneCount().call()
+        followers = [state.view(row, Follower) for row in range(1, len(sample) + 1)]
+        assign_gas = []
+        for i, (account, follower) in enumerate(zip(sample, followers)):
+            follower.slot = drone_count - 1 - i
+            assign_gas.append(send_as(w3, account, contract_instance.functions.assignPosition(follower.slot)).gasUsed)
+
+        state.drain(1)
+        for account, follower in zip(sample, followers):
+            send_as(w3, account, contract_instance.functions.submitBatteryLevel(follower.battery))
+        election = send_as(w3, sample[0], contract_instance.functions.checkLeaderStatus())
+
+        start = time.perf_counter()
+        observer.get_snapshot(contract_instance)
+        snapshot_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        observer.get_available_positions(contract_instance)
+        bitmap_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{n:<8}{register_gas:<14}{register_seconds:<12.3f}{max(assign_gas, default=0):<16}{election.gasUsed:<14}{snapshot_ms:<13.1f}{bitmap_ms:<10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 
 #Add as many followers as u want
-from web3 import Web3
 import asyncio
 from mavsdk import System 
 from dotenv import load_dotenv
 from compile import compile_contract
+from rpc import async_connect
+from registry import async_formation_address
+from async_drone import AsyncFollower
+from geodesy import slot_coordinates, rank_slots
+from monitor import LivenessMonitor
 import os
-import math
 import sys
 
 """ 
@@ -16,9 +19,12 @@ import sys
     and can be used in combination with gazebo software, for a visual result.    
     Mavsdk API is used for drone handling and web3 module for accessing the 
     smart contract's functions. Haversine formula is used for coordinate 
-    transformation.
+    transformation (see geodesy.py).
 """
 
+FORMATION_DISTANCES = [20, 40, 20, 40]
+FORMATION_BEARINGS = [-30, -30, 30, 30]
+
 
 async def run():
     ID = 1 #follower ID
@@ -35,16 +41,16 @@ async def run():
     #connecting to blockchain
     load_dotenv()
     URL_RPC = os.getenv("URL_RPC")
-    CONTR_ADD = os.getenv("CONTR_ADD")
 
-    w3 = Web3(Web3.HTTPProvider(URL_RPC))
+    w3 = await async_connect(URL_RPC)
     abi, bytecode = compile_contract()
 
-    contract = w3.eth.contract(abi=abi, bytecode=bytecode)
-    contract_address = CONTR_ADD
+    contract_address = await async_formation_address(w3) # CONTR_ADD, or SWARM_ID's formation in the registry
     contract_instance = w3.eth.contract(address=contract_address, abi=abi)
     print("Smart Contract Instance Created...")
 
+    follower = AsyncFollower(ID, "47.397661, 8.542879", 100)
+
     # checking the gps Connection via telemetry health command
     print("Establishing GPS lock on uav_follower_1..")
     async for health in uav_follower_1.telemetry.health():
@@ -57,42 +63,22 @@ async def run():
         absolute_altitude = terrain_info.absolute_altitude_m
         break
 
-    leader_add = w3.eth.accounts[0]
+    leader_add = await follower.leader_address(contract_instance, w3)
     print(f"Leader's Address is: {leader_add}\n")
     print("Retriving Leader's Location from Blockchain")
 
-    #Retrieving data from blockchain, including leader's location.    
-    data = get_drone_data(w3, contract_instance, ID)
-    for i in range(len(data)):
-        if data[i][3] == leader_add:
-            location = data[i][1]
-    print(f"Location: {location}") 
-
-    leader_coords = location.split(", ")
-    lat_lead = float(leader_coords[0])
-    long_lead = float(leader_coords[1])
-
-    position_mapping = {'1': (47.397761766994634, 8.542927142069864),
-                        '2': (47.39791753383577, 8.542794283354194),
-                        '3': (47.397761766994634, 8.543192857930137),
-                        '4': (47.39791753383577, 8.543325716645807)
-                        }
+    #Retrieving leader's latest (packed) location from blockchain.    
+    lat_lead, long_lead, alt_lead = await follower.get_location(contract_instance, leader_add)
+    print(f"Location: {lat_lead}, {long_lead}") 
+
+    #V formation slots around the leader, keyed by on-chain position (index + 1): positions 1, 2 on the 
+    #left wing and 3, 4 on the right wing. Change the distances (metres) and bearings (degrees) according the formation 
+    slot_coords = slot_coordinates(lat_lead, long_lead, FORMATION_DISTANCES, FORMATION_BEARINGS)
     
     #Retrieving available positions from blockchain.
-    avail_positions = get_available_positions(w3, contract_instance, ID)
+    avail_positions = await follower.get_available_positions(contract_instance)
 
     print(f" Available Positions are: {avail_positions}\n")
-
-    avail_positions_mapped = []
-    if 1 in avail_positions:
-        avail_positions_mapped.append(position_mapping["1"])
-    if 2 in avail_positions:
-        avail_positions_mapped.append(position_mapping["2"])
-    if 3 in avail_positions:
-        avail_positions_mapped.append(position_mapping["3"])
-    if 4 in avail_positions:
-        avail_positions_mapped.append(position_mapping["4"])
-    
     
     #Sending follower in a random location near leader
     flying_alt = absolute_altitude + 20
@@ -113,79 +99,29 @@ async def run():
     await uav_follower_1.action.goto_location(drone_lat, drone_lon, flying_alt, 0)
     await asyncio.sleep(90)
 
-    formation_distance = 20 #Distance beetween follower leader. change this according the formation 
-    #angles for V formation    
-    formation_angle = [math.radians(30), math.radians(-30)]
-    
-    #calculating closest position for every drone
-    closest_position = select_closest_position(drone_lat, drone_lon, lat_lead, long_lead, formation_distance, formation_angle, avail_positions_mapped)
-    
-    key_postition = [k for k, v in position_mapping.items() if v == closest_position][0]
-    
-    #sumbitting position into blockchain    
-    print(f"Position {key_postition} selected... Sumbitting into blockchain")
-    select_position(contract_instance, w3, int(key_postition), ID)
+    #ranking the slots by distance, the closest one still free is claimed with a single transaction
+    preferences = rank_slots(drone_lat, drone_lon, slot_coords, lat_lead, long_lead)
+    print(f"Claiming the closest available position of {preferences}... Sumbitting into blockchain")
+    try:
+        _, key_postition = await follower.claim_best_position(contract_instance, w3, preferences)
+    except Exception:
+        print("No available position in the formation")
+        sys.exit(1)
+    print(f"Position {key_postition} selected")
+    closest_position = slot_coords[key_postition - 1]
 
     print("going to clossest position")
     await uav_follower_1.action.goto_location(closest_position[0], closest_position[1], flying_alt, 0)
+
+    #watching the leader's heartbeat deadline, checkLeaderStatus is only sent after a timeout
+    liveness_task = asyncio.ensure_future(LivenessMonitor(follower, contract_instance, w3,
+                                                          on_election=lambda leader: print(f"New leader elected: {leader}")).run())
     
     while True:
         print("Staying connected, press Ctrl-C to exit")
         await asyncio.sleep(1)
 
 
-def get_drone_data(w3, contract_instance, ID):
-    return contract_instance.functions.getDroneData().call({"from": w3.eth.accounts[ID]})
-
-    #inverse Haversine formula
-def calculate_follower_coordinates(leader_lat, leader_lon, distance, angle):
-    leader_lat_rad = math.radians(leader_lat)
-    leader_lon_rad = math.radians(leader_lon)
-
-    # Earth's radius in meters
-    earth_radius = 6371000
-
-
-    distance_rad = distance / earth_radius
-
-    # Calculate the follower's latitude and longitude
-    follower_lat_rad = math.asin(math.sin(leader_lat_rad) * math.cos(distance_rad) +
-                                 math.cos(leader_lat_rad) * math.sin(distance_rad) * math.cos(angle))
-
-    follower_lon_rad = leader_lon_rad + math.atan2(math.sin(angle) * math.sin(distance_rad) * math.cos(leader_lat_rad),
-                                                   math.cos(distance_rad) - math.sin(leader_lat_rad) * math.sin(follower_lat_rad))
-
-    follower_lat = math.degrees(follower_lat_rad)
-    follower_lon = math.degrees(follower_lon_rad)
-
-    return follower_lat, follower_lon
-
-def get_available_positions(w3, contract_instance, ID):
-        return contract_instance.functions.getAvailablePositions().call({"from": w3.eth.accounts[ID]})
-
-def select_position(contract_instance, w3, position, ID):
-        tx_hash = contract_instance.functions.assignPosition(position).transact({"from": w3.eth.accounts[ID]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-def select_closest_position(drone_lat, drone_lon, leader_lat, leader_lon, formation_distance, formation_angle, available_positions):
-    closest_distance = float('inf')  # Initialize with a large value
-    closest_position = None
-
-    for angle in formation_angle:
-
-        follower_lat, follower_lon = calculate_follower_coordinates(leader_lat, leader_lon, formation_distance, angle)
-
-        # calculating the distance between the drone and the follower position
-        distance = math.sqrt((drone_lat - follower_lat) ** 2 + (drone_lon - follower_lon) ** 2)
-
-        # checking if this position is closer than the previous closest position
-        if distance < closest_distance and (follower_lat, follower_lon) in available_positions:
-            closest_distance = distance
-            closest_position = (follower_lat, follower_lon)
-
-    return closest_position
-
 if __name__ == "__main__":
     asyncio.run(run())
 
@@ -0,0 +1,83 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+"""
+    Vectorised geodesy for the gazebo scripts. Formation slots are given as offsets from the leader
+    (distance in metres, bearing in degrees clockwise from north) and converted to lat/lon for all
+    slots in one pass with the inverse haversine formula. Drone-to-slot distances are measured in a
+    local east/north tangent plane around the leader's fix, which is cached per fix, so re-planning on
+    every telemetry tick stays cheap. Slots are always referred to by their on-chain position
+    (index + 1), never by comparing float coordinates.
+"""
+
+EARTH_RADIUS = 6371000 # Earth's radius in meters
+
+
+def destination_points(lat, lon, distances, bearings):
+    """
+    Inverse haversine: the points at distances (metres) and bearings (degrees) from (lat, lon).
+    All arguments broadcast against each other, the result has an extra last axis of [lat, lon].
+    """
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    distance_rad = np.asarray(distances, dtype=float) / EARTH_RADIUS
+    bearing_rad = np.radians(bearings)
+
+    dest_lat = np.arcsin(np.sin(lat_rad) * np.cos(distance_rad) +
+                         np.cos(lat_rad) * np.sin(distance_rad) * np.cos(bearing_rad))
+    dest_lon = lon_rad + np.arctan2(np.sin(bearing_rad) * np.sin(distance_rad) * np.cos(lat_rad),
+                                    np.cos(distance_rad) - np.sin(lat_rad) * np.sin(dest_lat))
+    return np.stack(np.broadcast_arrays(np.degrees(dest_lat), np.degrees(dest_lon)), axis=-1)
+
+
+class TangentPlane:
+    """
+    Local east/north projection around a reference fix (equirectangular approximation, accurate
+    to centimetres over formation sized distances).
+    """
+
+    def __init__(self, lat, lon) -> None:
+        self.lat = lat
+        self.lon = lon
+        self._north_per_deg = math.radians(1) * EARTH_RADIUS
+        self._east_per_deg = self._north_per_deg * math.cos(math.radians(lat))
+
+    def to_enu(self, coords):
+        """[..., [lat, lon]] -> [..., [east, north]] in metres."""
+        coords = np.asarray(coords, dtype=float)
+        east = (coords[..., 1] - self.lon) * self._east_per_deg
+        north = (coords[..., 0] - self.lat) * self._north_per_deg
+        return np.stack((east, north), axis=-1)
+
+    def to_geodetic(self, enu):
+        """[..., [east, north]] -> [..., [lat, lon]]."""
+        enu = np.asarray(enu, dtype=float)
+        lat = self.lat + enu[..., 1] / self._north_per_deg
+        lon = self.lon + enu[..., 0] / self._east_per_deg
+        return np.stack((lat, lon), axis=-1)
+
+
+@lru_cache(maxsize=32)
+def tangent_plane(lat, lon):
+    return TangentPlane(lat, lon)
+
+
+def slot_coordinates(leader_lat, leader_lon, distances, bearings):
+    """Lat/lon of every formation slot, slot_coordinates(...)[k] is on-chain position k+1."""
+    return destination_points(leader_lat, leader_lon, distances, bearings).reshape(-1, 2)
+
+
+def slot_distances(drone_coords, slot_coords, leader_lat, leader_lon):
+    """Distance in metres of every drone (rows, [lat, lon]) to every slot (columns)."""
+    plane = tangent_plane(leader_lat, leader_lon)
+    drones_enu = plane.to_enu(np.asarray(drone_coords, dtype=float).reshape(-1, 2))
+    slots_enu = plane.to_enu(slot_coords)
+    delta = drones_enu[:, None, :] - slots_enu[None, :, :]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def rank_slots(drone_lat, drone_lon, slot_coords, leader_lat, leader_lon):
+    """Every on-chain position ordered from the closest to the farthest slot, for assignBestAvailable."""
+    distances = slot_distances([drone_lat, drone_lon], slot_coords, leader_lat, leader_lon)[0]
+    return (np.argsort(distances, kind="stable") + 1).tolist()
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
-from web3 import Web3
 import asyncio
 from mavsdk import System 
 from dotenv import load_dotenv
 from compile import compile_contract
+from rpc import async_connect
+from registry import async_formation_address
+from async_drone import AsyncLeader
+from location import coordinates
+from telemetry import ContentStore, TelemetryBuffer
+from monitor import HeartbeatMonitor
 import os
 
 async def run():
@@ -21,16 +26,18 @@ async def run():
     load_dotenv()
     URL_RPC = os.getenv("URL_RPC")
     NUMB_DRONES = int(os.getenv("NUMB_DRONES"))
-    CONTR_ADD = os.getenv("CONTR_ADD")
 
-    w3 = Web3(Web3.HTTPProvider(URL_RPC))
+    w3 = await async_connect(URL_RPC)
     abi, bytecode = compile_contract()
 
-    contract = w3.eth.contract(abi=abi, bytecode=bytecode)
-    contract_address = CONTR_ADD
+    contract_address = await async_formation_address(w3) # CONTR_ADD, or SWARM_ID's formation in the registry
     contract_instance = w3.eth.contract(address=contract_address, abi=abi)
     print("Smart Contract Instance Created...")
 
+    lead = AsyncLeader(0, "47.397606, 8.543060", 100)
+    #heartbeats on an adaptive schedule for the whole flight
+    heartbeat_task = asyncio.ensure_future(HeartbeatMonitor(lead, contract_instance, w3).run())
+
 
     print("Establishing GPS lock on UAV_leader..")
     #checking the gps Connection via telemetry health command
@@ -57,38 +64,54 @@ async def run():
 
     await uav_leader.action.goto_location(47.397606, 8.543060, flying_alt, 0)
 
-    drone_add = []
-    for i in range(1, NUMB_DRONES):
-        drone_add.append(w3.eth.accounts[i])
+    accounts = await w3.eth.accounts
+    drone_add = accounts[1:NUMB_DRONES]
 
     print("Adding Drones Into Blockchain...")
-    count = 1
-    for drone in drone_add:
-        add_drone(contract_instance, w3, drone, ID=0)
+    #batched registration, one transaction per gas-limit sized chunk of addresses
+    await lead.add_drones(contract_instance, w3, drone_add)
+    for count, drone in enumerate(drone_add, start=1):
         print(f"Drone with ID:{count} added to Blockchain with address: {drone}")
-        count += 1    
     
-    flag = True
-    location = "47.397606, 8.543060"
+    #submitting leader's (packed) location in the background while keeping the connection alive. The data 
+    #readings are kept in a local content-addressed store and only each batch's Merkle root goes on-chain
     data = "Hello from Leader!"
+    lat, lon = coordinates(lead.location)
+    submit_task = asyncio.ensure_future(lead.submit_location(contract_instance, w3, lat, lon, flying_alt))
+    telemetry = TelemetryBuffer(ContentStore(os.getenv("TELEMETRY_STORE", "telemetry_store")), await lead.address(w3),
+                                int(os.getenv("TELEMETRY_BATCH", "60")))
+    commit_task = None
     while True:
-        if flag:
-            submit_data_once(contract_instance, w3, location, data, ID=0)
-            flag = False
-            print("Data Sumbited Successfully into Blockchain")
+        #a failed transaction is logged and sent again on the next tick instead of ending the flight
+        if submit_task is not None and submit_task.done():
+            try:
+                submit_task.result()
+                submit_task = None
+                print("Location Sumbited Successfully into Blockchain")
+            except Exception as error:
+                print(f"[!] Location submission failed ({error}), retrying")
+                submit_task = asyncio.ensure_future(lead.submit_location(contract_instance, w3, lat, lon, flying_alt))
+        telemetry.add(lead.location, data)
+        if commit_task is not None and commit_task.done():
+            try:
+                (receipt, batch_id), (root, digests) = commit_task.result()
+                if receipt.status != 1 or batch_id is None:
+                    raise ValueError("commitBatch reverted")
+                telemetry.committed(root, digests, batch_id)
+                print(f"Batch {batch_id} of {len(digests)} readings committed into Blockchain")
+            except Exception as error:
+                telemetry.failed() #the readings stay pending and go into the next batch
+                print(f"[!] Batch commit failed ({error}), retrying")
+            commit_task = None
+        if commit_task is None and telemetry.full:
+            commit_task = asyncio.ensure_future(commit(lead, contract_instance, w3, telemetry.take()))
         print("Staying connected, press Ctrl-C to exit")
         await asyncio.sleep(1)
 
 
-def submit_data_once(contract_instance, w3, location, data, ID):
-        tx_hash = contract_instance.functions.submitData(location, data).transact({"from": w3.eth.accounts[ID]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
-
-def add_drone(contract_instance, w3, drone_address, ID):
-        tx_hash = contract_instance.functions.addDrone(drone_address).transact({"from": w3.eth.accounts[ID]})
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        return tx_receipt
+async def commit(lead, contract_instance, w3, batch):
+    root, digests = batch
+    return await lead.commit_batch(contract_instance, w3, root, len(digests)), batch
 
 
 if __name__ == "__main__":
@@ -1,42 +1,128 @@
 import os
-from solcx import compile_standard, install_solc
+import hashlib
+import tempfile
 from dotenv import load_dotenv
 import json
 
-def compile_contract():
+"""
+    Compiled artifacts are cached under CACHE_DIR, keyed by a hash of the contract source, the solc
+    version and the compiler settings, so that scripts which start together (leader, followers, deploy)
+    only invoke solc once. Setting PREBUILT_ABI=1 in .env loads the ABI/bytecode straight from
+    compiled_formation.json without importing solcx at all. The artifact records the sha256 of the
+    source it was built from and is refused once formation.sol has changed (run python compile.py).
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__)) # paths below do not depend on the caller's working directory
+CONTRACT_FILE = "formation.sol" # also the source's name inside the compiler output
+CONTRACT_NAME = "LeaderFormation"
+CONTRACT_PATH = os.path.join(HERE, CONTRACT_FILE)
+ARTIFACT_FILE = os.path.join(HERE, "compiled_formation.json")
+CACHE_DIR = os.path.join(HERE, ".solc_cache")
+
+MAX_CODE_SIZE = 24576 # EIP-170 limit of a deployed contract, in bytes
+
+SETTINGS = {
+    "optimizer": {"enabled": True, "runs": 200},
+    "outputSelection": {
+        "*": {
+            "*": ["abi", "metadata", "evm.bytecode", "evm.bytecode.sourceMap", "evm.deployedBytecode.object"]
+            }
+        }
+    }
+
+
+def _atomic_write_json(path, obj):
+    """Writes obj to path through a temporary file, so readers never see a half written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(obj, file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _extract(compiled_sol, contract_name=CONTRACT_NAME):
+    contract = compiled_sol["contracts"][CONTRACT_FILE][contract_name]
+    # get bytecode
+    bytecode = contract["evm"]["bytecode"]["object"]
+    # get abi
+    abi = json.loads(contract["metadata"])["output"]["abi"]
+    return abi, bytecode
+
+
+def cache_key(source, solc_version, settings=SETTINGS):
+    """Content hash of everything that affects the compiler output."""
+    h = hashlib.sha256()
+    h.update(source.encode())
+    h.update(str(solc_version).encode())
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def load_prebuilt(path=ARTIFACT_FILE, contract_name=CONTRACT_NAME):
+    """Runtime mode: returns abi and bytecode from an already compiled artifact, no solcx needed."""
+    with open(path, "r") as file:
+        compiled_sol = json.load(file)
+    with open(CONTRACT_PATH, "r") as file:
+        expected = source_hash(file.read())
+    if compiled_sol.get("sourceHash") != expected:
+        raise ValueError(f"{path} was not built from the current {CONTRACT_FILE}, recompile it with python compile.py")
+    return _extract(compiled_sol, contract_name)
+
+
+def compile_contract(contract_name=CONTRACT_NAME):
 
     load_dotenv()
+    if os.getenv("PREBUILT_ABI", "0") not in ("", "0", "false", "False"):
+        return load_prebuilt(contract_name=contract_name)
+
     SOLC_VERSION = os.getenv('SOLC_VERSION')
-    install_solc(SOLC_VERSION)
 
-    with open('./formation.sol', 'r') as file:
+    with open(CONTRACT_PATH, 'r') as file:
         formation_file = file.read()
 
+    key = cache_key(formation_file, SOLC_VERSION)
+    cache_path = os.path.join(CACHE_DIR, key + ".json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as file:
+            return _extract(json.load(file), contract_name)
+
+    from solcx import compile_standard, install_solc
+    install_solc(SOLC_VERSION)
+
     compiled_sol = compile_standard(
     {
         "language": "Solidity",
-        "sources": {"formation.sol": {"content": formation_file}},
-        "settings": {
-            "outputSelection": {
-                "*": {
-                    "*": ["abi", "metadata", "evm.bytecode", "evm.bytecode.sourceMap"]
-                    }
-                }
-            },
+        "sources": {CONTRACT_FILE: {"content": formation_file}},
+        "settings": SETTINGS,
         },
         solc_version=SOLC_VERSION,
     )
 
-    with open("compiled_formation.json", "w") as file:
-        json.dump(compiled_sol, file)
+    compiled_sol["sourceHash"] = source_hash(formation_file)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _atomic_write_json(cache_path, compiled_sol)
+    _atomic_write_json(ARTIFACT_FILE, compiled_sol)
+
+    return _extract(compiled_sol, contract_name)
+
+
+def code_sizes(compiled_sol):
+    """Deployed bytecode size of every contract in the artifact, in bytes."""
+    return {name: len(contract["evm"]["deployedBytecode"]["object"]) // 2
+            for name, contract in compiled_sol["contracts"][CONTRACT_FILE].items()}
+
 
-    # get bytecode
-    bytecode = compiled_sol["contracts"]["formation.sol"]["LeaderFormation"]["evm"]["bytecode"]["object"]
-    # get abi
-    abi = json.loads(compiled_sol["contracts"]["formation.sol"]["LeaderFormation"]["metadata"])["output"]["abi"]
-    return abi, bytecode
-    
-    
 if __name__ == "__main__":
     compile_contract()
-
+    with open(ARTIFACT_FILE, "r") as file:
+        compiled_sol = json.load(file)
+    for name, size in code_sizes(compiled_sol).items():
+        print(f"{name}: {size} bytes deployed{' (over the EIP-170 limit)' if size > MAX_CODE_SIZE else ''}")
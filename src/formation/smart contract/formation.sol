@@ -49,40 +49,119 @@ contract LeaderFormation {
         FormationType formationType;
         bool active;
     }
+/*
+    Compact drone location: latitude and longitude in micro-degrees and altitude in centimetres, 
+    each an int32, packed into a uint96 as (lat << 64) | (lon << 32) | alt. Together with the 
+    submission time it fits into a single storage slot.
+*/
+    struct PackedLocation {
+        uint96 location;
+        uint64 timestamp;
+    }
+/*
+    Off-chain telemetry: the raw readings stay in the drones' local stores and only the Merkle 
+    root of each batch of readings is committed, with the number of readings it covers.
+*/
+    struct TelemetryBatch {
+        bytes32 root;
+        uint32 count;
+        uint64 timestamp;
+        address submitter;
+    }
+/*
+    Everything a drone needs on each control loop iteration, returned by a single 
+    getSwarmSnapshot() call instead of one eth_call per value.
+*/
+    struct SwarmSnapshot {
+        address leader;
+        bool leaderIsAlive;
+        uint256 lastHeartbeat;
+        uint32 droneCount;
+        bool hasActiveMission;
+        Mission activeMission;
+        uint256[] positionBitmap; // occupancy bitmap of the active formation, see getPositionBitmap
+        uint8[] batteryLevels;
+    }
     // Declaring variables and maps that will be used below.
 
     address public leader; //leader address
-    uint8 public droneCount; 
+    uint32 public droneCount; 
 
-    bool public leaderIsAlive = true; 
-    uint256 public lastHeartbeat; 
+    uint256 public lastHeartbeat; // the leader is alive while less than heartbeatTimeout old, see leaderIsAlive
     uint16 public heartbeatTimeout = 180; // heartbeat timeout in seconds
 
     mapping(address => bool) public drones;
-    mapping(uint256 => address) public positionsTaken; 
-    mapping(address => uint8) public positions;
+
+/*
+    Formation positions live in position tables (epochs). Creating a mission, changing its formation 
+    or activating it again after it was deactivated gives the mission a fresh table in constant gas 
+    instead of clearing the old slots one by one. Table 0 is used while no mission is active.
+*/
+    uint256 public positionEpoch; // number of position tables opened so far
+    mapping(uint16 => uint256) public missionEpoch; // current position table of each mission
+    mapping(uint16 => bool) private missionActivated; // the mission has been activated at least once
+    mapping(uint256 => mapping(uint256 => address)) private positionsTaken; // epoch => position => drone
+    mapping(uint256 => mapping(address => uint32)) private positions; // epoch => drone => position
+    // epoch => word => occupancy bits, bit (p % 256) of word (p / 256) is set while position p is taken
+    mapping(uint256 => mapping(uint256 => uint256)) private positionBitmap;
 
     mapping(address => uint8) public batteryLevels;
 
+/*
+    Leader election candidates (registered drones with a non-zero battery level) are kept in 
+    buckets per battery level, plus a bitmap of the non-empty levels. The best candidate comes 
+    from the highest set bit, so an election costs the same gas whatever the swarm size.
+*/
+    uint256 private batteryLevelBitmap;
+    mapping(uint8 => address[]) private batteryBuckets;
+    mapping(address => uint256) private bucketIndex; // index + 1 in the drone's bucket, 0 if not a candidate
+
     mapping(uint256 => Mission) public missions; 
     uint16 public missionCount;
+    uint16 public activeMissionId; // the most recently activated mission
+    bool public hasActiveMission;
 
     event MissionCreated(uint16 indexed missionId);
     event MissionUpdated(uint16 indexed missionId);
     event MissionActivated(uint16 indexed missionId);
     event MissionDeactivated(uint16 indexed missionId);
 
+    mapping(address => PackedLocation) public packedLocations;
+
+/*
+    droneData is a ring buffer of the latest dataCapacity records: record index i lives in slot 
+    i % dataCapacity and overwrites record i - dataCapacity, which is announced with DataEvicted 
+    (the full record stays in its DataSubmitted log, see Dapp/archiver.py). Storage and read cost 
+    stay flat for the whole life of the contract.
+*/
+    uint256 public immutable dataCapacity;
+    uint256 public dataSubmitted; // number of records ever submitted, i.e. the index of the next one
     DataCollectedByDrone[] public droneData;
+    mapping(address => mapping(uint256 => uint256)) private submitterData; // submitter's n-th record => record index, ring of dataCapacity
+    mapping(address => uint256) private submitterCount;
+    mapping(address => DataCollectedByDrone) private pinnedLatest; // submitter's latest record, once evicted from the ring
+    TelemetryBatch[] public telemetryBatches;
     
     //events
     
     event DroneAdded(address drone);
-    event PositionAssigned(address drone, uint8 position);
+    event DroneRemoved(address drone);
+    event LeaderElected(address indexed newLeader);
+    event PositionAssigned(address drone, uint32 position, uint256 epoch);
+    event PositionReleased(address drone, uint32 position, uint256 epoch);
+    event PositionsReset(uint16 indexed missionId, uint256 epoch);
+    event LocationSubmitted(address indexed drone, uint96 location);
+    event DataSubmitted(address indexed submitter, uint256 indexed index, uint256 timestamp, string location, string data);
+    event DataEvicted(address indexed submitter, uint256 indexed index);
+    event BatchCommitted(address indexed submitter, uint256 indexed batchId, bytes32 root, uint32 count);
 
-    constructor() {
+    constructor(uint256 _dataCapacity) {
+        require(_dataCapacity > 0, "Data capacity must be positive");
+        dataCapacity = _dataCapacity;
         leader = msg.sender;
         drones[leader] = true;
         droneCount = 1;
+        emit DroneAdded(leader); // so that event consumers (Dapp/indexer.py) see the leader as a drone
     }
 
     modifier onlyLeader() {
@@ -91,69 +170,328 @@ contract LeaderFormation {
     }
     // (Only) leader can add (or remove) drones with these functions
     function addDrone(address drone) public onlyLeader {
+        _addDrone(drone);
+    }
+    
+    function removeDrone(address drone) public onlyLeader {
+        _removeDrone(drone);
+    }
+
+    // Batch versions, so that a whole swarm can be (un)registered with a handful of transactions.
+    function addDrones(address[] calldata newDrones) public onlyLeader {
+        for (uint256 i = 0; i < newDrones.length; i++) {
+            _addDrone(newDrones[i]);
+        }
+    }
+
+    function removeDrones(address[] calldata oldDrones) public onlyLeader {
+        for (uint256 i = 0; i < oldDrones.length; i++) {
+            _removeDrone(oldDrones[i]);
+        }
+    }
+
+    // Registering a drone twice (or removing an unknown one) is a no-op, so that batches never corrupt droneCount.
+    function _addDrone(address drone) private {
+        if (drones[drone]) {
+            return;
+        }
         drones[drone] = true;
         droneCount++; //increasing droneCount var
+        _insertCandidate(drone);
         emit DroneAdded(drone);
     }
-    
-    function removeDrone(address drone) public onlyLeader {
+
+    function _removeDrone(address drone) private {
+        if (!drones[drone]) {
+            return;
+        }
         drones[drone] = false;
         droneCount--;
+        _removeCandidate(drone);
+        _releasePosition(currentEpoch(), drone);
+        emit DroneRemoved(drone);
     }
   
-    // Clearing positions in case the formation changes
-    function clearPositions() private {
-        for (uint8 i = 0; i < droneCount; i++) {
-            address drone = positionsTaken[i+1];
-            if (drones[drone]) {
-            delete positions[drone];
-            }
-            positionsTaken[i+1] = address(0);
-        }
+    // each drone in the swarm can select its position in the formation of the active mission
+    function assignPosition(uint32 position) public {
+        _assignPosition(currentEpoch(), position);
     }
-    // each drone in the swarm can select its position in the formation
-    function assignPosition(uint8 position) public {
+
+    // or in the formation of a specific mission
+    function assignPositionFor(uint16 missionId, uint32 position) public {
+        require(missions[missionId].id == missionId, "Mission does not exist.");
+        _assignPosition(missionEpoch[missionId], position);
+    }
+
+    function _assignPosition(uint256 epoch, uint32 position) private {
         require(drones[msg.sender], "Only drones can assign positions");
         require(position > 0 && position < droneCount, "Invalid position");
-        require(positions[msg.sender] == 0, "Position already assigned");
-        require(positionsTaken[position] == address(0), "Position already taken");
-        positions[msg.sender] = position;
-        positionsTaken[position] = msg.sender;
-        emit PositionAssigned(msg.sender, position);
+        require(positions[epoch][msg.sender] == 0, "Position already assigned");
+        require(!_isTaken(epoch, position), "Position already taken");
+        positions[epoch][msg.sender] = position;
+        positionsTaken[epoch][position] = msg.sender;
+        positionBitmap[epoch][position >> 8] |= uint256(1) << (position & 0xff);
+        emit PositionAssigned(msg.sender, position, epoch);
+    }
+
+    // Ranked claim: assigns the first free position of preferences in a single transaction, instead of 
+    // one assignPosition transaction (and revert) per guess. The result is emitted with PositionAssigned.
+    function assignBestAvailable(uint32[] calldata preferences) public returns (uint32) {
+        return _assignBestAvailable(currentEpoch(), preferences);
+    }
+
+    function assignBestAvailableFor(uint16 missionId, uint32[] calldata preferences) public returns (uint32) {
+        require(missions[missionId].id == missionId, "Mission does not exist.");
+        return _assignBestAvailable(missionEpoch[missionId], preferences);
+    }
+
+    function _assignBestAvailable(uint256 epoch, uint32[] calldata preferences) private returns (uint32) {
+        for (uint256 i = 0; i < preferences.length; i++) {
+            uint32 position = preferences[i];
+            if (position > 0 && position < droneCount && !_isTaken(epoch, position)) {
+                _assignPosition(epoch, position);
+                return position;
+            }
+        }
+        revert("None of the preferred positions is available");
+    }
+
+    // a drone can leave its position in the active mission's formation
+    function releasePosition() public {
+        uint256 epoch = currentEpoch();
+        require(positions[epoch][msg.sender] != 0, "No position assigned");
+        _releasePosition(epoch, msg.sender);
+    }
+
+    function _releasePosition(uint256 epoch, address drone) private {
+        uint32 position = positions[epoch][drone];
+        if (position == 0) {
+            return;
+        }
+        delete positions[epoch][drone];
+        delete positionsTaken[epoch][position];
+        positionBitmap[epoch][position >> 8] &= ~(uint256(1) << (position & 0xff));
+        emit PositionReleased(drone, position, epoch);
+    }
+
+    function _isTaken(uint256 epoch, uint256 position) private view returns (bool) {
+        return (positionBitmap[epoch][position >> 8] & (uint256(1) << (position & 0xff))) != 0;
+    }
+
+    // Raw occupancy bitmap of the active mission's formation (see positionBitmap), 
+    // the valid positions are 1 .. positionCount - 1.
+    function getPositionBitmap() public view returns (uint256[] memory words, uint256 positionCount) {
+        return _positionBitmap(currentEpoch());
+    }
+
+    function getPositionBitmapFor(uint16 missionId) public view returns (uint256[] memory words, uint256 positionCount) {
+        return _positionBitmap(missionEpoch[missionId]);
+    }
+
+    function _positionBitmap(uint256 epoch) private view returns (uint256[] memory words, uint256 positionCount) {
+        positionCount = droneCount;
+        words = new uint256[](positionCount / 256 + 1);
+        for (uint256 i = 0; i < words.length; i++) {
+            words[i] = positionBitmap[epoch][i];
+        }
+    }
+
+    // Position table of the active mission.
+    function currentEpoch() public view returns (uint256) {
+        return hasActiveMission ? missionEpoch[activeMissionId] : 0;
+    }
+
+    function getPosition(uint16 missionId, address drone) public view returns (uint32) {
+        return positions[missionEpoch[missionId]][drone];
+    }
+
+    function getPositionHolder(uint16 missionId, uint32 position) public view returns (address) {
+        return positionsTaken[missionEpoch[missionId]][position];
+    }
+
+    function _resetPositions(uint16 missionId) private {
+        positionEpoch++;
+        missionEpoch[missionId] = positionEpoch;
+        emit PositionsReset(missionId, positionEpoch);
     }
 
     // Data submition funcion. Drone's location and data they collect can be stored.
      function submitData(string memory _location, string memory _data) public {
         require(drones[msg.sender], "Error: A drone must be in the swarm in order to submit data.");
-        droneData.push(DataCollectedByDrone(block.timestamp, _location, _data, msg.sender));
+        uint256 index = dataSubmitted;
+        DataCollectedByDrone memory record = DataCollectedByDrone(block.timestamp, _location, _data, msg.sender);
+        if (index < dataCapacity) {
+            droneData.push(record);
+        } else {
+            uint256 slot = index % dataCapacity;
+            _evict(index - dataCapacity, slot);
+            droneData[slot] = record;
+        }
+        uint256 count = submitterCount[msg.sender];
+        submitterData[msg.sender][count % dataCapacity] = index;
+        submitterCount[msg.sender] = count + 1;
+        dataSubmitted = index + 1;
+        emit DataSubmitted(msg.sender, index, block.timestamp, _location, _data);
+    }
+
+    function _evict(uint256 index, uint256 slot) private {
+        address submitter = droneData[slot].submitter;
+        // a drone's latest record is pinned, so getLatestData keeps answering after its eviction
+        if (submitter != msg.sender && submitterData[submitter][(submitterCount[submitter] - 1) % dataCapacity] == index) {
+            pinnedLatest[submitter] = droneData[slot];
+        }
+        emit DataEvicted(submitter, index);
+    }
+
+    // Batched alternative to submitData: one transaction commits the Merkle root of count readings.
+    function commitBatch(bytes32 root, uint32 count) public returns (uint256) {
+        require(drones[msg.sender], "Error: A drone must be in the swarm in order to submit data.");
+        require(count > 0, "Empty batch");
+        uint256 batchId = telemetryBatches.length;
+        telemetryBatches.push(TelemetryBatch(root, count, uint64(block.timestamp), msg.sender));
+        emit BatchCommitted(msg.sender, batchId, root, count);
+        return batchId;
+    }
+
+    function getBatchCount() public view returns (uint256) {
+        return telemetryBatches.length;
+    }
+
+    // Inclusion proof of a reading, leaf = keccak256(keccak256(reading)). Pairs are hashed in sorted
+    // order, so the proof is just the list of sibling hashes from the leaf up to the root.
+    function verifyReading(uint256 batchId, bytes32 leaf, bytes32[] calldata proof) public view returns (bool) {
+        require(batchId < telemetryBatches.length, "Batch does not exist");
+        bytes32 hash = leaf;
+        for (uint256 i = 0; i < proof.length; i++) {
+            bytes32 sibling = proof[i];
+            hash = hash < sibling ? keccak256(abi.encodePacked(hash, sibling)) : keccak256(abi.encodePacked(sibling, hash));
+        }
+        return hash == telemetryBatches[batchId].root;
     }
 
-    // Retrieving submitted data from Blockchain. 
+    // Location submission in the packed format, a single storage write instead of two strings.
+    function submitLocation(uint96 location) public {
+        require(drones[msg.sender], "Error: A drone must be in the swarm in order to submit its location.");
+        packedLocations[msg.sender] = PackedLocation(location, uint64(block.timestamp));
+        emit LocationSubmitted(msg.sender, location);
+    }
+
+    function getLocation(address drone) public view returns (uint96 location, uint64 timestamp) {
+        PackedLocation storage packed = packedLocations[drone];
+        require(packed.timestamp != 0, "No location submitted by this drone.");
+        return (packed.location, packed.timestamp);
+    }
+
+    // Retrieving the records still in the ring buffer from Blockchain, oldest first. 
     function getDroneData() public view returns (DataCollectedByDrone[] memory) {
-        DataCollectedByDrone[] memory output = new DataCollectedByDrone[](droneData.length);
-        for (uint i = 0; i < droneData.length; i++) {
-            output[i] = DataCollectedByDrone({
-                timestamp: droneData[i].timestamp,
-                location: droneData[i].location,
-                data: droneData[i].data,
-                submitter: droneData[i].submitter
-            });
+        uint256 first = getFirstDataIndex();
+        DataCollectedByDrone[] memory output = new DataCollectedByDrone[](dataSubmitted - first);
+        for (uint256 i = 0; i < output.length; i++) {
+            output[i] = droneData[(first + i) % dataCapacity];
         }
         return output;
     }
+
+/*
+    Paginated views over droneData, so that clients can read the mission log in bounded 
+    pages instead of copying the whole buffer with getDroneData(). Offsets are record indexes 
+    (or a submitter's own record numbers), pages start at the oldest record not evicted yet 
+    and return that start together with the records.
+*/
+    function getDroneDataCount() public view returns (uint256) {
+        return dataSubmitted;
+    }
+
+    function getDroneDataCountBySubmitter(address submitter) public view returns (uint256) {
+        return submitterCount[submitter];
+    }
+
+    // Index of the oldest record still stored.
+    function getFirstDataIndex() public view returns (uint256) {
+        return dataSubmitted > dataCapacity ? dataSubmitted - dataCapacity : 0;
+    }
+
+    // Returns at most limit records, starting from record offset.
+    function getDroneDataRange(uint256 offset, uint256 limit) public view returns (uint256 start, DataCollectedByDrone[] memory output) {
+        uint256 first = getFirstDataIndex();
+        start = offset < first ? first : offset;
+        output = new DataCollectedByDrone[](_pageLength(dataSubmitted, start, limit));
+        for (uint256 i = 0; i < output.length; i++) {
+            output[i] = droneData[(start + i) % dataCapacity];
+        }
+    }
+
+    // Same as above, but only over the records submitted by a specific drone.
+    function getDroneDataBySubmitter(address submitter, uint256 offset, uint256 limit) public view returns (uint256 start, DataCollectedByDrone[] memory output) {
+        uint256 first = _firstSubmitterRecord(submitter);
+        start = offset < first ? first : offset;
+        output = new DataCollectedByDrone[](_pageLength(submitterCount[submitter], start, limit));
+        for (uint256 i = 0; i < output.length; i++) {
+            output[i] = droneData[submitterData[submitter][(start + i) % dataCapacity] % dataCapacity];
+        }
+    }
+
+    // The submitter's records still stored are its latest ones, binary search for the oldest of them.
+    function _firstSubmitterRecord(address submitter) private view returns (uint256) {
+        uint256 count = submitterCount[submitter];
+        uint256 low = count > dataCapacity ? count - dataCapacity : 0;
+        uint256 high = count;
+        uint256 first = getFirstDataIndex();
+        while (low < high) {
+            uint256 mid = (low + high) / 2;
+            if (submitterData[submitter][mid % dataCapacity] < first) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        return low;
+    }
+
+    // Latest record submitted by a drone (e.g. the leader's current location), in constant gas.
+    function getLatestData(address submitter) public view returns (DataCollectedByDrone memory) {
+        uint256 count = submitterCount[submitter];
+        require(count > 0, "No data submitted by this drone.");
+        uint256 index = submitterData[submitter][(count - 1) % dataCapacity];
+        if (index < getFirstDataIndex()) {
+            return pinnedLatest[submitter];
+        }
+        return droneData[index % dataCapacity];
+    }
+
+    function _pageLength(uint256 total, uint256 offset, uint256 limit) private pure returns (uint256) {
+        if (offset >= total) {
+            return 0;
+        }
+        uint256 remaining = total - offset;
+        return remaining < limit ? remaining : limit;
+    }
+
     // Getting the available positions in the formation.
     function getAvailablePositions() public view returns (uint256[] memory) {
+        return _availablePositions(currentEpoch());
+    }
+
+    function getAvailablePositionsFor(uint16 missionId) public view returns (uint256[] memory) {
+        return _availablePositions(missionEpoch[missionId]);
+    }
+
+    function _availablePositions(uint256 epoch) private view returns (uint256[] memory) {
     uint256[] memory availablePositions = new uint256[](droneCount);
-    uint8 count = 0;
-    for (uint8 i = 1; i < droneCount; i++) {
-        if (positionsTaken[i] == address(0)) {
+    uint256 count = 0;
+    uint256 word = positionBitmap[epoch][0];
+    for (uint256 i = 1; i < droneCount; i++) {
+        if ((i & 0xff) == 0) {
+            word = positionBitmap[epoch][i >> 8];
+        }
+        if ((word & (uint256(1) << (i & 0xff))) == 0) {
             availablePositions[count] = i;
             count++;
         }
     }
 
     uint256[] memory result = new uint256[](count);
-    for (uint8 i = 0; i < count; i++) {
+    for (uint256 i = 0; i < count; i++) {
         result[i] = availablePositions[i];
         }   
     return result;
@@ -164,28 +502,59 @@ contract LeaderFormation {
         missions[missionId] = Mission(missionId, name, missionType, formationType, false);
         missionCount++;
         emit MissionCreated(missionId);
+        _resetPositions(missionId); // own position table, so claims made before the activation are kept
     }
 
     function updateMission(uint16 missionId, string memory name, MissionType missionType, FormationType formationType) public onlyLeader {
         require(missions[missionId].id == missionId, "Mission does not exist.");
         missions[missionId].name = name;
         missions[missionId].missionType = missionType;
-        missions[missionId].formationType = formationType;
+        if (missions[missionId].formationType != formationType) {
+            missions[missionId].formationType = formationType;
+            _resetPositions(missionId);
+        }
         emit MissionUpdated(missionId);
     }
 
     function activateMission(uint16 missionId) public onlyLeader {
             require(missions[missionId].id == missionId, "Mission does not exist.");
+            // a mission that ran before starts its new run from an empty table, an active one keeps its claims
+            if (!missions[missionId].active && missionActivated[missionId]) {
+                _resetPositions(missionId);
+            }
             missions[missionId].active = true;
+            missionActivated[missionId] = true;
+            activeMissionId = missionId;
+            hasActiveMission = true;
             emit MissionActivated(missionId);
         }
         
     function deactivateMission(uint16 missionId) public onlyLeader {
         require(missions[missionId].id == missionId, "Mission does not exist.");
         missions[missionId].active = false;
+        if (activeMissionId == missionId) {
+            hasActiveMission = false;
+        }
         emit MissionDeactivated(missionId);
     }
 
+    // Swarm state in one call. Battery levels are returned for the requested drones, in the same order.
+    function getSwarmSnapshot(address[] calldata batteryOf) public view returns (SwarmSnapshot memory snapshot) {
+        snapshot.leader = leader;
+        snapshot.leaderIsAlive = leaderIsAlive();
+        snapshot.lastHeartbeat = lastHeartbeat;
+        snapshot.droneCount = droneCount;
+        snapshot.hasActiveMission = hasActiveMission;
+        if (hasActiveMission) {
+            snapshot.activeMission = missions[activeMissionId];
+        }
+        (snapshot.positionBitmap, ) = getPositionBitmap();
+        snapshot.batteryLevels = new uint8[](batteryOf.length);
+        for (uint256 i = 0; i < batteryOf.length; i++) {
+            snapshot.batteryLevels[i] = batteryLevels[batteryOf[i]];
+        }
+    }
+
     function getMission(uint16 missionId) public view returns(string memory name, MissionType missionType, FormationType formationType, bool active) {
         require(missions[missionId].id == missionId, "Mission does not exist.");
         Mission storage mission = missions[missionId];
@@ -200,35 +569,74 @@ contract LeaderFormation {
         require(drones[msg.sender], "Only Leader can send a heartbeat signal.");
         lastHeartbeat = block.timestamp;
     }
-    // Can be used by follower to check if their leader is alive.
+    // Liveness is derived from the last heartbeat, so checking it is a free eth_call.
+    function leaderIsAlive() public view returns (bool) {
+        return block.timestamp - lastHeartbeat <= heartbeatTimeout;
+    }
+    // Can be used by a follower to replace a leader that timed out, a no-op while the leader is alive.
     function checkLeaderStatus() public {
-        if (block.timestamp - lastHeartbeat > heartbeatTimeout) {
-            leaderIsAlive = false;
-            if (msg.sender != leader) {
-                electNewLeader();
-            }
+        if (!leaderIsAlive() && msg.sender != leader) {
+            electNewLeader();
         }
     }
-    // New leader election mechanism based on battery levels.
+    // New leader election mechanism based on battery levels. The current leader is the only drone 
+    // that can't be elected, so at most two buckets with at most two entries each are looked at.
     function electNewLeader() private {
-        uint8 maxBattery = 0;
-        address newLeader = address(0);
-        for (uint8 i = 0; i < droneCount; i++) {
-            address drone = positionsTaken[i+1];
-            if (drones[drone]) {
-                uint8 battery = getBatteryLevel(drone);
-                if (battery > maxBattery) {
-                    maxBattery = battery;
-                    newLeader = drone;
+        uint256 levels = batteryLevelBitmap;
+        while (levels != 0) {
+            uint8 level = _highestBit(levels);
+            address[] storage bucket = batteryBuckets[level];
+            for (uint256 i = 0; i < bucket.length && i < 2; i++) {
+                if (bucket[i] != leader) {
+                    leader = bucket[i];
+                    lastHeartbeat = block.timestamp; // grace period for the new leader's first heartbeat
+                    emit LeaderElected(leader);
+                    return;
                 }
             }
+            levels &= ~(uint256(1) << level);
+        }
+    }
+
+    function _insertCandidate(address drone) private {
+        uint8 level = batteryLevels[drone];
+        if (level == 0 || bucketIndex[drone] != 0) {
+            return;
         }
-        if (newLeader != address(0)) {
-            leader = newLeader;
-            leaderIsAlive = true;
+        batteryBuckets[level].push(drone);
+        bucketIndex[drone] = batteryBuckets[level].length;
+        batteryLevelBitmap |= uint256(1) << level;
+    }
+
+    function _removeCandidate(address drone) private {
+        uint256 index = bucketIndex[drone];
+        if (index == 0) {
+            return;
+        }
+        uint8 level = batteryLevels[drone];
+        address[] storage bucket = batteryBuckets[level];
+        address last = bucket[bucket.length - 1];
+        bucket[index - 1] = last;
+        bucketIndex[last] = index;
+        bucket.pop();
+        delete bucketIndex[drone];
+        if (bucket.length == 0) {
+            batteryLevelBitmap &= ~(uint256(1) << level);
         }
     }
 
+    // Index of the most significant set bit of x (x != 0), by binary search.
+    function _highestBit(uint256 x) private pure returns (uint8 r) {
+        if (x >= 1 << 128) { x >>= 128; r += 128; }
+        if (x >= 1 << 64) { x >>= 64; r += 64; }
+        if (x >= 1 << 32) { x >>= 32; r += 32; }
+        if (x >= 1 << 16) { x >>= 16; r += 16; }
+        if (x >= 1 << 8) { x >>= 8; r += 8; }
+        if (x >= 1 << 4) { x >>= 4; r += 4; }
+        if (x >= 1 << 2) { x >>= 2; r += 2; }
+        if (x >= 1 << 1) { r += 1; }
+    }
+
     function getBatteryLevel(address drone) public view returns (uint8) {
         require(drones[drone], "Only drones can retrieve battery levels.");
         return batteryLevels[drone];
@@ -236,6 +644,87 @@ contract LeaderFormation {
 
     function submitBatteryLevel(uint8 batteryLevel) public {
         require(drones[msg.sender], "Only drones can submit battery levels.");
+        _removeCandidate(msg.sender);
         batteryLevels[msg.sender] = batteryLevel;
+        _insertCandidate(msg.sender);
     }    
 }
+
+/*
+    Directory of the LeaderFormation instances running on the chain, one per swarm. It only stores 
+    addresses: a factory creating the swarms with `new LeaderFormation(...)` would embed the whole 
+    formation bytecode (beyond the 24KB contract size limit) and would become every swarm's leader. 
+    Swarms are deployed by their leaders (see Dapp/registry.py) and registered here by id.
+*/
+contract SwarmRegistry {
+
+    struct Swarm {
+        address formation;
+        address owner;
+        uint64 registeredAt;
+    }
+
+    mapping(bytes32 => Swarm) private swarms;
+    bytes32[] private swarmIds;
+    mapping(bytes32 => bool) private listed; // in swarmIds already, a re-registered id is not listed twice
+
+    event SwarmRegistered(bytes32 indexed swarmId, address indexed formation, address indexed owner);
+    event SwarmDeregistered(bytes32 indexed swarmId);
+
+    // Only the leader of a formation can register it.
+    function registerSwarm(bytes32 swarmId, address formation) public {
+        _registerSwarm(swarmId, formation);
+    }
+
+    function registerSwarms(bytes32[] calldata ids, address[] calldata formations) public {
+        require(ids.length == formations.length, "Every swarm id needs a formation");
+        for (uint256 i = 0; i < ids.length; i++) {
+            _registerSwarm(ids[i], formations[i]);
+        }
+    }
+
+    function _registerSwarm(bytes32 swarmId, address formation) private {
+        require(swarms[swarmId].formation == address(0), "Swarm id already registered");
+        require(formation.code.length > 0, "Formation is not a contract");
+        require(LeaderFormation(formation).leader() == msg.sender, "Only the swarm's leader can register it");
+        swarms[swarmId] = Swarm(formation, msg.sender, uint64(block.timestamp));
+        if (!listed[swarmId]) {
+            listed[swarmId] = true;
+            swarmIds.push(swarmId);
+        }
+        emit SwarmRegistered(swarmId, formation, msg.sender);
+    }
+
+    function deregisterSwarm(bytes32 swarmId) public {
+        require(swarms[swarmId].owner == msg.sender, "Only the swarm's owner can deregister it");
+        delete swarms[swarmId];
+        emit SwarmDeregistered(swarmId);
+    }
+
+    function getSwarm(bytes32 swarmId) public view returns (address formation, address owner, uint64 registeredAt) {
+        Swarm storage swarm = swarms[swarmId];
+        require(swarm.formation != address(0), "Swarm not registered");
+        return (swarm.formation, swarm.owner, swarm.registeredAt);
+    }
+
+    // Formation addresses of many swarms in one call, address(0) for the unknown ids.
+    function getFormations(bytes32[] calldata ids) public view returns (address[] memory formations) {
+        formations = new address[](ids.length);
+        for (uint256 i = 0; i < ids.length; i++) {
+            formations[i] = swarms[ids[i]].formation;
+        }
+    }
+
+    // Ids ever registered (deregistered ones included, their formation is address(0)), in pages.
+    function getSwarmCount() public view returns (uint256) {
+        return swarmIds.length;
+    }
+
+    function getSwarmIds(uint256 offset, uint256 limit) public view returns (bytes32[] memory ids) {
+        uint256 count = offset < swarmIds.length ? swarmIds.length - offset : 0;
+        ids = new bytes32[](count < limit ? count : limit);
+        for (uint256 i = 0; i < ids.length; i++) {
+            ids[i] = swarmIds[offset + i];
+        }
+    }
+}
@@ -0,0 +1,11 @@
+import os
+import sys
+
+"""
+    The scripts import each other as top level modules (see PYTHONPATH in the README), so the tests put
+    the same folders on sys.path. Run them from src/formation with python -m pytest -q tests.
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("smart contract", "Dapp", "gazebo", "benchmarks"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
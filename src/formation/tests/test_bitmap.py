@@ -0,0 +1,24 @@
+from bitmap import taken_mask, free_mask, free_positions
+
+
+def words_for(taken, position_count):
+    words = [0] * ((position_count + 255) // 256)
+    for position in taken:
+        words[position // 256] |= 1 << (position % 256)
+    return words
+
+
+def test_positions_span_several_words():
+    taken = {1, 2, 255, 256, 300, 511}
+    words = words_for(taken, 600)
+    assert set(taken_mask(words, 600).nonzero()[0].tolist()) == taken
+    assert free_positions(words, 600) == set(range(1, 600)) - taken
+
+
+def test_position_zero_is_never_free():
+    assert free_mask([0], 4).tolist() == [False, True, True, True]
+    assert free_positions([0b10], 3) == {2}
+
+
+def test_bits_beyond_the_position_count_are_ignored():
+    assert free_positions(words_for({5, 9}, 10), 5) == {1, 2, 3, 4}
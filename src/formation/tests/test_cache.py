@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+from eth_utils import event_abi_to_log_topic
+import pytest
+import cache
+from cache import ContractCache, INVALIDATING_EVENTS
+
+
+class FakeEvent:
+    def __init__(self, name):
+        self.name = name
+        self.abi = {"type": "event", "name": name, "anonymous": False,
+                    "inputs": [{"name": "missionId", "type": "uint16", "indexed": True}]}
+
+    def process_log(self, log):
+        return {"event": self.name, "args": {"missionId": log["missionId"]}}
+
+
+class FakeChain:
+    """Just enough of Web3 and a LeaderFormation instance for ContractCache."""
+
+    def __init__(self):
+        self.block_number = 10
+        self.missions = {0: ("patrol", 0, 2, False), 1: ("dive", 1, 1, False)}
+        self.reads = 0
+        self.logs = []
+        self.eth = self
+        self.address = "0x" + "22" * 20
+        self.events = SimpleNamespace(**{name: (lambda name=name: FakeEvent(name)) for name in INVALIDATING_EVENTS})
+        self.functions = SimpleNamespace(getMission=lambda mission_id: SimpleNamespace(call=lambda: self._read(mission_id)))
+
+    def _read(self, mission_id):
+        self.reads += 1
+        return self.missions[mission_id]
+
+    def get_logs(self, params):
+        return [log for log in self.logs if params["fromBlock"] <= log["block"] <= params["toBlock"]]
+
+    def emit(self, name, mission_id):
+        self.block_number += 1
+        topic = event_abi_to_log_topic(FakeEvent(name).abi)
+        self.logs.append({"block": self.block_number, "topics": [topic], "missionId": mission_id})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_reads_are_served_from_memory(clock):
+    chain = FakeChain()
+    contract_cache = ContractCache(chain, chain)
+    assert contract_cache.get_mission(0) == contract_cache.get_mission(0) == ("patrol", 0, 2, False)
+    assert chain.reads == 1 and (contract_cache.hits, contract_cache.misses) == (1, 1)
+
+
+def test_events_drop_only_the_missions_they_touch(clock):
+    chain = FakeChain()
+    contract_cache = ContractCache(chain, chain, sync_interval=1)
+    contract_cache.get_mission(0)
+    contract_cache.get_mission(1)
+    chain.missions[0] = ("patrol", 0, 2, True)
+    chain.emit("MissionActivated", 0)
+    clock[0] += 1
+    assert contract_cache.get_mission(0) == ("patrol", 0, 2, True)
+    contract_cache.get_mission(1)
+    assert chain.reads == 3 and contract_cache.checkpoint == chain.block_number
+
+
+def test_entries_expire_after_the_ttl(clock):
+    chain = FakeChain()
+    contract_cache = ContractCache(chain, chain, ttl=5, sync_interval=100)
+    contract_cache.get_mission(0)
+    clock[0] += 4
+    contract_cache.get_mission(0)
+    clock[0] += 2
+    contract_cache.get_mission(0)
+    assert chain.reads == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    chain = FakeChain()
+    chain.missions[2] = ("city", 2, 0, False)
+    contract_cache = ContractCache(chain, chain, maxsize=2, sync_interval=100)
+    contract_cache.get_mission(0)
+    contract_cache.get_mission(1)
+    contract_cache.get_mission(0) # 1 is now the least recently used
+    contract_cache.get_mission(2)
+    reads = chain.reads
+    contract_cache.get_mission(0)
+    assert chain.reads == reads
+    contract_cache.get_mission(1)
+    assert chain.reads == reads + 1
+
+
+def test_long_idle_cache_starts_over(clock):
+    chain = FakeChain()
+    contract_cache = ContractCache(chain, chain, sync_interval=100)
+    contract_cache.get_mission(0)
+    chain.block_number += cache.LOG_BATCH_SIZE + 1
+    assert contract_cache.sync() == 1
+    assert contract_cache.checkpoint == chain.block_number
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import formations
+from formations import FORMATIONS, CONTRACT_FORMATIONS, formation, slots, distance_matrix, rank_slots, register_formation
+
+
+@pytest.mark.parametrize("kind", sorted(FORMATIONS))
+@pytest.mark.parametrize("num_drones", [1, 2, 5, 10])
+def test_formations_have_one_slot_per_drone_around_the_leader(kind, num_drones):
+    coords = formation(kind, num_drones, 3)
+    assert coords.shape == (num_drones, 2)
+    assert len(np.unique(coords, axis=0)) == num_drones
+    if num_drones % 2 or kind != "v": # an even V has no drone on its axis
+        assert [0, 0] in coords.tolist()
+        assert slots(kind, num_drones, 3).shape == (num_drones - 1, 2)
+
+
+def test_contract_formation_types_are_registered():
+    assert set(CONTRACT_FORMATIONS.values()) <= set(FORMATIONS)
+
+
+def test_formations_are_memoised_and_read_only():
+    assert formation("ring", 6, 4) is formation("ring", 6, 4)
+    with pytest.raises(ValueError):
+        formation("ring", 6, 4)[0, 0] = 1
+    with pytest.raises(ValueError):
+        slots("ring", 6, 4)[0, 0] = 1
+
+
+def test_ring_slots_are_on_the_radius():
+    assert np.allclose(np.hypot(*slots("ring", 7, 5).T), 5)
+
+
+def test_diamond_shells():
+    coords = formation("diamond", 9, 2)
+    assert (np.abs(coords).sum(axis=1) / 2).tolist() == [0, 1, 1, 1, 1, 2, 2, 2, 2]
+
+
+def test_registered_formation(monkeypatch):
+    monkeypatch.setattr(formations, "FORMATIONS", dict(FORMATIONS))
+    register_formation("column")(lambda num_drones, spacing: [[0, -i * spacing] for i in range(num_drones)])
+    assert slots("column", 3, 2).tolist() == [[0, -2], [0, -4]]
+
+
+def test_distance_matrix_and_ranking():
+    slot_coords = [[3, 0], [0, 4], [-1, 0]]
+    assert distance_matrix([[0, 0], [3, 4]], slot_coords).tolist() == [[3, 4, 1], [4, 3, np.hypot(4, 4)]]
+    assert rank_slots([0, 0], slot_coords) == [3, 1, 2]
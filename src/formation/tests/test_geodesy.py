@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from geodesy import destination_points, tangent_plane, slot_coordinates, slot_distances, rank_slots
+
+LEADER = (47.3977, 8.5456)
+
+
+def test_destination_points_follow_the_bearing():
+    north, east = destination_points(*LEADER, [100, 100], [0, 90])
+    assert north[0] > LEADER[0] and north[1] == pytest.approx(LEADER[1])
+    assert east[1] > LEADER[1] and east[0] == pytest.approx(LEADER[0], abs=1e-6)
+
+
+def test_slot_distances_match_the_offsets():
+    distances = [10, 20, 30]
+    slot_coords = slot_coordinates(*LEADER, distances, [0, 120, 240])
+    assert slot_coords.shape == (3, 2)
+    assert slot_distances([LEADER], slot_coords, *LEADER)[0] == pytest.approx(distances, abs=0.01)
+
+
+def test_tangent_plane_round_trip_and_cache():
+    plane = tangent_plane(*LEADER)
+    assert plane is tangent_plane(*LEADER)
+    enu = np.array([[12.5, -7.0], [0.0, 40.0]])
+    assert plane.to_enu(plane.to_geodetic(enu)) == pytest.approx(enu)
+
+
+def test_rank_slots_uses_on_chain_positions():
+    slot_coords = slot_coordinates(*LEADER, [10, 10, 10], [0, 90, 180])
+    drone_lat, drone_lon = destination_points(*LEADER, 12, 95)
+    assert rank_slots(drone_lat, drone_lon, slot_coords, *LEADER)[0] == 2
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from eth_utils import event_abi_to_log_topic
+from indexer import Indexer
+
+DRONE_ADDED = {"type": "event", "name": "DroneAdded", "anonymous": False,
+               "inputs": [{"name": "drone", "type": "address", "indexed": True}]}
+LEADER = "0x" + "11" * 20
+
+
+class FakeEvent:
+    def process_log(self, log):
+        return {"event": "DroneAdded", "args": {"drone": log["drone"]}, "blockNumber": log["block"]}
+
+
+class FakeChain:
+    """Just enough of Web3 and a LeaderFormation instance for Indexer, with forks."""
+
+    def __init__(self, length=10):
+        self.blocks = [("main", number) for number in range(length + 1)] # (fork, number) stands for a block hash
+        self.logs = []
+        self.eth = self
+        self.abi = [DRONE_ADDED]
+        self.address = "0x" + "22" * 20
+        self.events = SimpleNamespace(DroneAdded=FakeEvent)
+        self.functions = SimpleNamespace(leader=lambda: SimpleNamespace(call=lambda block_identifier: LEADER))
+        self.on_get_logs = None
+
+    @property
+    def block_number(self):
+        return len(self.blocks) - 1
+
+    def get_block(self, number):
+        fork, number = self.blocks[number]
+        return {"hash": f"{fork}-{number}".encode()}
+
+    def get_logs(self, params):
+        logs = [log for log in self.logs
+                if params["fromBlock"] <= log["block"] <= params["toBlock"] and log["fork"] == self.blocks[log["block"]][0]]
+        if self.on_get_logs is not None:
+            self.on_get_logs()
+        return logs
+
+    def add_drone(self, drone, block, fork="main"):
+        self.logs.append({"block": block, "fork": fork, "topics": [event_abi_to_log_topic(DRONE_ADDED)], "drone": drone})
+
+    def fork(self, name, from_block):
+        for number in range(from_block, len(self.blocks)):
+            self.blocks[number] = (name, number)
+
+
+def test_sync_applies_the_events_and_moves_the_checkpoint():
+    chain = FakeChain()
+    chain.add_drone("a", 3)
+    chain.add_drone("b", 8)
+    indexer = Indexer(chain, chain, ":memory:", batch_size=4)
+    assert indexer.sync() == 2
+    assert sorted(indexer.drones()) == ["a", "b"] and indexer.leader() == LEADER
+    assert indexer.checkpoint == 10
+    assert indexer.sync() == 0
+
+
+def test_reorg_below_the_checkpoint_replays_the_store():
+    chain = FakeChain()
+    chain.add_drone("a", 3)
+    chain.add_drone("b", 8)
+    indexer = Indexer(chain, chain, ":memory:")
+    indexer.sync()
+    chain.fork("side", 6) # b's block is orphaned, c is mined on the new branch
+    chain.add_drone("c", 7, fork="side")
+    indexer.sync()
+    assert sorted(indexer.drones()) == ["a", "c"]
+    assert indexer.checkpoint == 10
+
+
+def test_reorg_during_a_range_is_rolled_back_and_fetched_again():
+    chain = FakeChain()
+    chain.add_drone("a", 3)
+    chain.add_drone("b", 6, fork="side")
+    indexer = Indexer(chain, chain, ":memory:", batch_size=4)
+
+    def reorg_once():
+        if indexer.checkpoint == 3: # while the range 4..7 is fetched
+            chain.on_get_logs = None
+            chain.fork("side", 5)
+    chain.on_get_logs = reorg_once
+    indexer.sync() # the first answer for 4..7 is from the orphaned branch, without b
+    assert sorted(indexer.drones()) == ["a", "b"]
+    assert indexer.checkpoint == 10
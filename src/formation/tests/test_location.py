@@ -0,0 +1,28 @@
+import pytest
+import location
+from location import encode, decode, parse, coordinates
+
+
+@pytest.mark.parametrize("lat, lon, alt", [(0, 0, 0), (31.3, 49.2, 12.5), (-33.868820, 151.209296, -4.2), (-90, -180, 0), (90, 180, 1000)])
+def test_round_trip(lat, lon, alt):
+    assert decode(encode(lat, lon, alt)) == pytest.approx((lat, lon, alt), abs=1e-6)
+
+
+def test_packed_layout_fits_uint96():
+    packed = encode(-1, -1, -0.01)
+    assert packed < 2**96
+    assert packed >> 64 == 2**32 - 1000000 and packed & 0xFFFFFFFF == 2**32 - 1
+
+
+def test_values_out_of_range_are_refused():
+    with pytest.raises(ValueError):
+        encode(0, 0, 2**31 / location.ALTITUDE_SCALE)
+    with pytest.raises(ValueError):
+        encode(2200, 0)
+
+
+def test_legacy_strings():
+    assert parse("31.3, 49.2") == (31.3, 49.2)
+    assert coordinates("31.3, 49.2") == coordinates((31.3, 49.2, 7)) == (31.3, 49.2)
+    with pytest.raises(ValueError):
+        parse("31.3,49.2")
@@ -0,0 +1,42 @@
+from itertools import permutations
+import numpy as np
+import pytest
+from planner import linear_sum_assignment, plan_positions
+
+
+def brute_force(cost):
+    n, m = cost.shape
+    if n <= m:
+        return min(sum(cost[i, j] for i, j in enumerate(columns)) for columns in permutations(range(m), n))
+    return brute_force(cost.T)
+
+
+@pytest.mark.parametrize("shape", [(4, 4), (3, 6), (6, 3), (1, 5), (5, 1)])
+def test_assignment_is_optimal(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(5):
+        cost = rng.integers(0, 50, size=shape).astype(float)
+        rows, columns = linear_sum_assignment(cost)
+        assert len(rows) == min(shape)
+        assert list(rows) == sorted(rows) and len(set(columns)) == len(columns)
+        assert cost[rows, columns].sum() == pytest.approx(brute_force(cost))
+
+
+def test_drones_take_their_nearest_slots_without_crossing():
+    slots = [[-3, 0], [3, 0], [0, 3]]
+    drones = [[0, 4], [-4, 0], [4, 1]]
+    assert plan_positions(drones, slots) == [3, 1, 2]
+
+
+def test_only_available_positions_are_planned():
+    slots = [[-3, 0], [3, 0], [0, 3]]
+    drones = [[3, 0], [0, 3]]
+    plan = plan_positions(drones, slots, available=[1, 3, 7])
+    assert sorted(plan) == [1, 3] and plan[1] == 3
+
+
+def test_drones_beyond_the_free_slots_get_none():
+    plan = plan_positions([[0, 0], [10, 0], [1, 0]], [[1, 0]])
+    assert plan == [None, None, 1]
+    assert plan_positions([], [[1, 0]]) == []
+    assert plan_positions([[0, 0]], [[1, 0]], available=[]) == [None]
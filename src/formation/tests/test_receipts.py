@@ -0,0 +1,45 @@
+import pytest
+from web3 import Web3, EthereumTesterProvider
+from web3.exceptions import TimeExhausted
+from receipts import ReceiptTracker, tracker_for
+
+
+@pytest.fixture
+def w3():
+    return Web3(EthereumTesterProvider())
+
+
+def send(w3, count):
+    accounts = w3.eth.accounts
+    return [w3.eth.send_transaction({"from": accounts[0], "to": accounts[1], "value": 1}) for _ in range(count)]
+
+
+def test_tracked_transactions_resolve_from_the_blocks(w3):
+    tx_hashes = send(w3, 3)
+    with ReceiptTracker(w3, poll_interval=0.01) as tracker:
+        receipts = tracker.wait_all(tx_hashes, timeout=10)
+        assert [receipt.transactionHash for receipt in receipts] == tx_hashes
+        assert tracker.pending == 0
+        stats = tracker.stats()
+        assert stats["count"] == 3 and stats["p50"] <= stats["max"]
+
+
+def test_callback_runs_with_the_receipt(w3):
+    tx_hash, = send(w3, 1)
+    mined = []
+    with ReceiptTracker(w3, poll_interval=0.01) as tracker:
+        tracker.track(tx_hash, callback=mined.append).result(10)
+    assert [receipt.transactionHash for receipt in mined] == [tx_hash]
+
+
+def test_unknown_transaction_times_out_and_is_forgotten(w3):
+    with ReceiptTracker(w3, poll_interval=0.01) as tracker:
+        with pytest.raises(TimeExhausted):
+            tracker.wait(b"\x01" * 32, timeout=0.1)
+        assert tracker.pending == 0
+        assert tracker.stats() == {"count": 0}
+
+
+def test_one_tracker_per_connection(w3):
+    assert tracker_for(w3) is tracker_for(w3)
+    assert tracker_for(w3) is not tracker_for(Web3(EthereumTesterProvider()))
@@ -0,0 +1,33 @@
+from drone import registration_batches, registration_probe, probe_gas_per_address, GAS_PER_REGISTRATION, REGISTRATION_PROBE_SIZE
+
+GAS_LIMIT = 30_000_000
+
+
+def test_batches_keep_every_address_in_order():
+    addresses = [f"0x{i:040x}" for i in range(1000)]
+    batches = registration_batches(addresses, GAS_LIMIT, gas_per_address=75_000)
+    assert [address for batch in batches for address in batch] == addresses
+    assert all(len(batch) * 75_000 <= GAS_LIMIT * 0.8 for batch in batches)
+
+
+def test_heavier_addresses_give_smaller_batches():
+    addresses = list(range(2000))
+    light = registration_batches(addresses, GAS_LIMIT)
+    heavy = registration_batches(addresses, GAS_LIMIT, gas_per_address=80_000)
+    assert len(light[0]) == int(GAS_LIMIT * 0.8 // GAS_PER_REGISTRATION)
+    assert len(heavy[0]) == int(GAS_LIMIT * 0.8 // 80_000)
+
+
+def test_cheap_probe_never_goes_below_the_floor():
+    # a probe of already registered drones is a no-op and must not inflate the batches
+    assert registration_batches(list(range(5000)), GAS_LIMIT, gas_per_address=1_000) == registration_batches(list(range(5000)), GAS_LIMIT)
+
+
+def test_explicit_batch_size_wins():
+    assert registration_batches(list(range(10)), GAS_LIMIT, batch_size=4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_probe():
+    assert registration_probe(range(100)) == list(range(REGISTRATION_PROBE_SIZE))
+    assert probe_gas_per_address([1, 2, 3, 4], 200_000) == 50_000
+    assert probe_gas_per_address([], 0) is None
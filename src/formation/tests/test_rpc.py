@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from web3 import Web3, EthereumTesterProvider
+from web3.exceptions import ContractLogicError, Web3RPCError
+import rpc
+
+# echo(uint256 x) returns x and reverts when x == 0, hand assembled so the tests need no solc
+ECHO_RUNTIME = "600435801560105760005260206000f35b60006000fd"
+ECHO_INIT = "601680600b6000396000f3" + ECHO_RUNTIME
+ECHO_ABI = [{"type": "function", "name": "echo", "stateMutability": "view",
+             "inputs": [{"name": "x", "type": "uint256"}], "outputs": [{"name": "", "type": "uint256"}]}]
+
+
+@pytest.fixture(scope="module")
+def tester():
+    w3 = Web3(EthereumTesterProvider())
+    receipt = w3.eth.wait_for_transaction_receipt(w3.eth.send_transaction({"from": w3.eth.accounts[0], "data": "0x" + ECHO_INIT}))
+    return w3, receipt.contractAddress
+
+
+@pytest.fixture(scope="module")
+def node(tester):
+    """JSON-RPC over HTTP (batches included) in front of eth-tester, like a local Ganache."""
+    w3, address = tester
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            replies = [self._reply(request) for request in body] if isinstance(body, list) else self._reply(body)
+            data = json.dumps(replies).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _reply(self, request):
+            if request["method"] == "eth_call":
+                request["params"][0].setdefault("from", w3.eth.accounts[0])
+            try:
+                reply = w3.provider.make_request(request["method"], request["params"])
+            except Exception as error:
+                reply = {"error": {"code": -32000, "message": str(error)}}
+            return dict(reply, jsonrpc="2.0", id=request["id"])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", address
+    server.shutdown()
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1:8545", "https://rpc.example.org"])
+def test_provider_http_shares_a_pooled_session(url):
+    provider = rpc.provider(url)
+    assert isinstance(provider, Web3.HTTPProvider)
+    assert provider.endpoint_uri == url
+    assert rpc._session(url) is rpc._session(url)
+
+
+@pytest.mark.parametrize("url", ["ws://127.0.0.1:8546", "wss://rpc.example.org"])
+def test_provider_refuses_websocket(url):
+    with pytest.raises(ValueError, match="async_connect"):
+        rpc.provider(url)
+
+
+def test_batch_call_returns_results_in_order(node):
+    url, address = node
+    contract = Web3(rpc.provider(url)).eth.contract(address=address, abi=ECHO_ABI)
+    assert rpc.batch_call(contract.w3, [contract.functions.echo(x) for x in (3, 1, 2)]) == [3, 1, 2]
+    assert rpc.batch_call(contract.w3, []) == []
+
+
+def test_batch_call_default_only_replaces_reverts(node):
+    url, address = node
+    contract = Web3(rpc.provider(url)).eth.contract(address=address, abi=ECHO_ABI)
+    functions = [contract.functions.echo(1), contract.functions.echo(0), contract.functions.echo(2)]
+    assert rpc.batch_call(contract.w3, functions, default=None) == [1, None, 2]
+    with pytest.raises(ContractLogicError):
+        rpc.batch_call(contract.w3, functions)
+    # a node error (here an unknown block) is not a revert and is never replaced by default
+    with pytest.raises(Web3RPCError):
+        rpc.batch_call(contract.w3, [contract.functions.echo(1)], block=10 ** 6, default=None)
+
+
+def test_batch_call_without_batching_provider(tester):
+    w3, address = tester
+    contract = w3.eth.contract(address=address, abi=ECHO_ABI)
+    assert rpc.batch_call(w3, [contract.functions.echo(5), contract.functions.echo(6)]) == [5, 6]
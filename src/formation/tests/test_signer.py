@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+import pytest
+from eth_account import Account
+from web3 import Web3, EthereumTesterProvider
+from web3.exceptions import ContractLogicError, TimeExhausted
+from signer import NonceManager, LocalSigner
+
+
+class Transfer:
+    """Stands for a contract function: anything with build_transaction."""
+
+    def __init__(self, w3, to, fail=False):
+        self.w3, self.to, self.fail = w3, to, fail
+
+    def build_transaction(self, transaction):
+        if self.fail:
+            raise ContractLogicError("execution reverted") # as when the gas estimate reverts
+        fee = 2 * self.w3.eth.get_block("latest")["baseFeePerGas"]
+        return dict(transaction, to=self.to, value=1, gas=21000, maxFeePerGas=fee, maxPriorityFeePerGas=1)
+
+
+@pytest.fixture
+def funded():
+    w3 = Web3(EthereumTesterProvider())
+    account = Account.create()
+    w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": 10**18})
+    return w3, account
+
+
+def test_transactions_get_consecutive_nonces(funded):
+    w3, account = funded
+    signer = LocalSigner(w3, account.key)
+    tx_hashes = [signer.send(Transfer(w3, w3.eth.accounts[1])) for _ in range(3)]
+    receipts = [signer.wait(tx_hash) for tx_hash in tx_hashes]
+    assert all(receipt.status == 1 for receipt in receipts)
+    assert [w3.eth.get_transaction(tx_hash).nonce for tx_hash in tx_hashes] == [0, 1, 2]
+
+
+def test_failed_send_leaves_no_nonce_gap(funded):
+    w3, account = funded
+    signer = LocalSigner(w3, account.key)
+    signer.wait(signer.send(Transfer(w3, w3.eth.accounts[1])))
+    with pytest.raises(ContractLogicError):
+        signer.send(Transfer(w3, w3.eth.accounts[1], fail=True))
+    tx_hash = signer.send(Transfer(w3, w3.eth.accounts[1]))
+    assert signer.wait(tx_hash).status == 1 and w3.eth.get_transaction(tx_hash).nonce == 1
+
+
+def test_dropped_transaction_resyncs_from_the_node():
+    counts = []
+    eth = SimpleNamespace(get_transaction_count=lambda address, block: counts.append(block) or 5,
+                          account=Account, chain_id=1)
+    w3 = SimpleNamespace(eth=eth)
+
+    class SlowTracker:
+        def wait(self, tx_hash, timeout):
+            raise TimeExhausted
+
+    signer = LocalSigner(w3, Account.create().key, tracker=SlowTracker())
+    assert [signer.nonces.next(signer.address) for _ in range(2)] == [5, 6]
+    with pytest.raises(TimeExhausted):
+        signer.wait(b"\x00" * 32)
+    assert signer.nonces.next(signer.address) == 5
+    assert counts == ["pending", "pending"]
+
+
+def test_nonce_counters_are_per_account():
+    nonces = NonceManager(SimpleNamespace(eth=SimpleNamespace(get_transaction_count=lambda address, block: len(address))))
+    assert [nonces.next("ab"), nonces.next("abc"), nonces.next("ab")] == [2, 3, 3]
@@ -0,0 +1,37 @@
+import numpy as np
+from swarm import SwarmState
+from drone import Drone
+
+
+def test_simulated_swarm():
+    state = SwarmState.simulated(100, (31.3, 49.2), spread=5, battery=(50, 60), seed=1)
+    assert len(state) == 100 and state.ids.tolist() == list(range(100))
+    assert np.all(np.abs(state.relative_positions("31.3, 49.2")) <= 5)
+    assert state.battery.min() >= 50 and state.battery.max() <= 60
+
+
+def test_add_grows_the_columns():
+    state = SwarmState(1)
+    rows = [state.add(id, (id, -id), 80, slot=id % 3) for id in range(5)]
+    assert rows == list(range(5))
+    assert state.positions[4].tolist() == [4, -4] and state.slots.tolist() == [0, 1, 2, 0, 1]
+
+
+def test_vectorised_updates():
+    state = SwarmState.simulated(4, (0, 0), spread=0, battery=(3, 3))
+    state.drain(2, rows=[0, 1])
+    state.drain(2)
+    assert state.battery.tolist() == [0, 0, 1, 1]
+    state.move([1, -1], rows=slice(2, None))
+    assert state.positions.tolist() == [[0, 0], [0, 0], [1, -1], [1, -1]]
+
+
+def test_drone_views_share_the_rows():
+    state = SwarmState.simulated(3, (0, 0), spread=0, battery=(90, 90))
+    drones = state.drones(Drone)
+    drones[1].battery = 40
+    drones[2].location = "1.5, 2.5"
+    assert state.battery.tolist() == [90, 40, 90]
+    assert state.positions[2].tolist() == [1.5, 2.5] and drones[2].location == "1.5, 2.5"
+    standalone = Drone(7, "0.0, 0.0", 55)
+    assert (standalone.id, standalone.battery) == (7, 55)
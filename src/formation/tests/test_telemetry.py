@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+import pytest
+from web3.exceptions import ContractLogicError
+from telemetry import (MerkleTree, ContentStore, TelemetryBuffer, TelemetrySubmitter, encode_reading, reading_leaf,
+                       hash_pair, verify_proof, inclusion_proof)
+from async_drone import AsyncLeader
+
+SUBMITTER = "0x" + "11" * 20
+
+
+def leaves(n):
+    return [reading_leaf(encode_reading(SUBMITTER, i, "31.3, 49.2", f"reading {i}")) for i in range(n)]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13])
+def test_every_leaf_proves_against_the_root(n):
+    tree = MerkleTree(leaves(n))
+    for index, leaf in enumerate(tree.levels[0]):
+        assert verify_proof(leaf, tree.proof(index), tree.root)
+
+
+def test_proof_fails_for_a_foreign_leaf_or_a_tampered_sibling():
+    tree = MerkleTree(leaves(6))
+    proof = tree.proof(2)
+    assert not verify_proof(leaves(7)[6], proof, tree.root)
+    assert not verify_proof(tree.levels[0][2], [proof[0][::-1]] + proof[1:], tree.root)
+
+
+def test_pairs_are_hashed_in_sorted_order():
+    a, b = leaves(2)
+    assert hash_pair(a, b) == hash_pair(b, a)
+    assert MerkleTree([a]).root == a
+
+
+def test_empty_tree_is_refused():
+    with pytest.raises(ValueError):
+        MerkleTree([])
+
+
+def test_readings_are_canonical():
+    assert encode_reading(SUBMITTER, 1, "x", "y") == encode_reading(SUBMITTER, 1, "x", "y")
+    assert encode_reading(SUBMITTER, 1, "x", "y") != encode_reading(SUBMITTER, 2, "x", "y")
+
+
+def test_content_store_keeps_one_copy(tmp_path):
+    store = ContentStore(str(tmp_path))
+    digest = store.put(b"reading")
+    assert store.put(b"reading") == digest
+    assert digest in store and store.get(digest) == b"reading"
+
+
+def test_buffer_keeps_a_taken_batch_until_it_is_committed(tmp_path):
+    store = ContentStore(str(tmp_path))
+    buffer = TelemetryBuffer(store, SUBMITTER, batch_size=2)
+    first = [buffer.add("31.3, 49.2", f"reading {i}", timestamp=i) for i in range(2)]
+    assert buffer.full
+    root, digests = buffer.take()
+    assert digests == first and buffer.take() is None
+    # readings added while the batch is in flight count for the next one only
+    buffer.add("31.3, 49.2", "late", timestamp=2)
+    assert not buffer.full and len(buffer) == 3
+
+    buffer.committed(root, digests, batch_id=7)
+    assert len(buffer) == 1
+    batch_id, leaf, proof = inclusion_proof(store, root, first[1])
+    assert batch_id == 7 and verify_proof(leaf, proof, root)
+
+
+def test_buffer_retakes_a_failed_batch(tmp_path):
+    buffer = TelemetryBuffer(ContentStore(str(tmp_path)), SUBMITTER, batch_size=2)
+    buffer.add("a", "1", timestamp=1)
+    buffer.add("a", "2", timestamp=2)
+    root, digests = buffer.take()
+    buffer.failed()
+    buffer.add("a", "3", timestamp=3)
+    retaken_root, retaken = buffer.take()
+    assert retaken[:2] == digests and len(retaken) == 3 and retaken_root != root
+
+
+class FakeDrone:
+    def __init__(self, status=1):
+        self.status = status
+        self.commits = []
+
+    def account(self, w3):
+        return SUBMITTER
+
+    def commit_batch(self, contract_instance, w3, root, count):
+        self.commits.append((root, count))
+        receipt = SimpleNamespace(status=self.status, transactionHash=b"\x01" * 32)
+        return receipt, (len(self.commits) - 1 if self.status == 1 else None)
+
+
+def test_submitter_commits_full_batches(tmp_path):
+    drone = FakeDrone()
+    submitter = TelemetrySubmitter(drone, None, None, ContentStore(str(tmp_path)), batch_size=3)
+    receipts = [submitter.submit("a", str(i), timestamp=i)[1] for i in range(7)]
+    assert [receipt is not None for receipt in receipts] == [False, False, True, False, False, True, False]
+    assert [count for root, count in drone.commits] == [3, 3]
+    assert len(submitter.buffer) == 1
+
+
+def test_submitter_keeps_the_readings_of_a_reverted_commit(tmp_path):
+    drone = FakeDrone(status=0)
+    submitter = TelemetrySubmitter(drone, None, None, ContentStore(str(tmp_path)), batch_size=2)
+    submitter.submit("a", "1", timestamp=1)
+    with pytest.raises(ContractLogicError):
+        submitter.submit("a", "2", timestamp=2)
+    assert len(submitter.buffer) == 2 and submitter.buffer.full
+
+
+def test_submitter_refuses_asyncio_drones(tmp_path):
+    with pytest.raises(TypeError):
+        TelemetrySubmitter(AsyncLeader(0, "31.3, 49.2", 90), None, None, ContentStore(str(tmp_path)))